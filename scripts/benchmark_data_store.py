@@ -0,0 +1,107 @@
+"""Benchmark the DataStore against the original implementation.
+
+Times the index build against the original recursive walk on every test
+corpus study, then the lookup throughput of the original string keys against
+the tuple keys on the largest study.
+
+Run from the repository root:
+
+    PYTHONPATH=src python scripts/benchmark_data_store.py [repeats]
+"""
+
+import sys
+import glob
+import json
+import timeit
+from uuid import UUID
+from datetime import date
+from usdm4 import USDM4
+from usdm4_fhir.utility.data_store import DataStore
+
+FILES = "tests/usdm4_fhir/test_files/**/*_usdm.json"
+
+
+class RecursiveDataStore:
+    """The original, recursive walk and string keys kept as the benchmark reference."""
+
+    def __init__(self, study):
+        self._references = {}
+        self._process_node(study)
+
+    def get(self, klass, id):
+        try:
+            key = self._key(klass, id)
+            if key in self._references:
+                return self._references[key]
+            else:
+                return None
+        except Exception:
+            return None
+
+    def _key(self, klass, id):
+        klass_name = klass if isinstance(klass, str) else klass.__name__
+        return f"{klass_name}.{id}"
+
+    def _process_node(self, node):
+        if type(node) is list:
+            if node:
+                for item in node:
+                    self._process_node(item)
+        elif type(node) in (str, float, date, bool, UUID) or node is None:
+            pass
+        else:
+            if hasattr(node, "instanceType"):
+                self._references[f"{node.instanceType}.{node.id}"] = node
+            for name, field in node.model_fields.items():
+                self._process_node(getattr(node, name))
+
+
+def build(studies: dict, repeats: int):
+    print(f"{'file':<45} {'items':>6} {'recursive':>10} {'iterative':>10} {'gain':>6}")
+    for path, study in studies.items():
+        items = len(DataStore(study)._references)
+        old = min(
+            timeit.repeat(lambda: RecursiveDataStore(study), number=1, repeat=repeats)
+        )
+        new = min(timeit.repeat(lambda: DataStore(study), number=1, repeat=repeats))
+        print(
+            f"{path.split('test_files/')[-1]:<45} {items:>6} {old * 1000:>8.1f}ms {new * 1000:>8.1f}ms {old / new:>5.1f}x"
+        )
+
+
+def lookup(studies: dict, repeats: int):
+    path, study = max(studies.items(), key=lambda x: len(DataStore(x[1])._references))
+    old_store = RecursiveDataStore(study)
+    new_store = DataStore(study)
+    keys = list(new_store._references.keys())
+    count = len(keys) * 10
+
+    def old_get():
+        for _ in range(10):
+            for klass, id in keys:
+                old_store.get(klass, id)
+
+    def new_get():
+        for _ in range(10):
+            for klass, id in keys:
+                new_store.get(klass, id)
+
+    print(f"\nLookups on {path.split('test_files/')[-1]}, {len(keys)} keys")
+    old = min(timeit.repeat(old_get, number=1, repeat=repeats))
+    new = min(timeit.repeat(new_get, number=1, repeat=repeats))
+    print(
+        f"string keys {count / old / 1e6:>5.2f}M/s, tuple keys {count / new / 1e6:>5.2f}M/s, {old / new:>4.1f}x"
+    )
+
+
+def main(repeats: int = 5):
+    studies = {}
+    for path in sorted(set(glob.glob(FILES, recursive=True))):
+        with open(path) as f:
+            studies[path] = USDM4().from_json(json.load(f)).study
+    build(studies, repeats)
+    lookup(studies, repeats)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,128 @@
+"""Benchmark the SoA export on a large, synthetic timeline.
+
+Builds a study from the SoA pilot with the main timeline replaced by one of
+500 visits over 300 activities, each visit with a tenth of the activities.
+Reports the time to build the timepoint plan definitions with the activity
+index rebuilt by every factory (as before it was shared) and shared across
+them, then the time of the whole export, validated and trusted.
+
+Run from the repository root:
+
+    PYTHONPATH=src python scripts/benchmark_soa_export.py [visits] [activities] [repeats]
+"""
+
+import sys
+import copy
+import json
+import timeit
+import warnings
+import yaml
+from usdm4 import USDM4
+from simple_error_log.errors import Errors
+from usdm4_fhir.soa.export.export_soa import ExportSoA
+from usdm4_fhir.utility.study_context import StudyContext
+from usdm4_fhir.factory.timepoint_plan_definition_factory import (
+    ActivityIndex,
+    TimepointPlanDefinitionFactory,
+)
+
+PILOT = "tests/usdm4_fhir/test_files/soa/export/pilot_usdm.json"
+EXTRA = "tests/usdm4_fhir/test_files/soa/export/pilot_extra.yaml"
+
+
+def synthetic(visits: int, activities: int):
+    with open(PILOT) as f:
+        data = json.load(f)
+    design = data["study"]["versions"][0]["studyDesigns"][0]
+    template = design["activities"][0]
+    design["activities"] = []
+    for index in range(1, activities + 1):
+        activity = copy.deepcopy(template)
+        activity["id"] = f"Activity_{index}"
+        activity["name"] = activity["label"] = f"Activity {index}"
+        activity["previousId"] = f"Activity_{index - 1}" if index > 1 else None
+        activity["nextId"] = f"Activity_{index + 1}" if index < activities else None
+        design["activities"].append(activity)
+    timeline = next(x for x in design["scheduleTimelines"] if x["mainTimeline"])
+    instance_template = timeline["instances"][0]
+    timing_template = next(
+        x for x in timeline["timings"] if x["type"]["decode"] != "Fixed Reference"
+    )
+    anchor_template = next(
+        x for x in timeline["timings"] if x["type"]["decode"] == "Fixed Reference"
+    )
+    timeline["instances"] = []
+    timeline["timings"] = []
+    for index in range(1, visits + 1):
+        id = f"ScheduledActivityInstance_{index}"
+        instance = copy.deepcopy(instance_template)
+        instance["id"] = id
+        instance["name"] = instance["label"] = f"Visit {index}"
+        instance["defaultConditionId"] = (
+            f"ScheduledActivityInstance_{index + 1}" if index < visits else None
+        )
+        instance["timelineExitId"] = (
+            timeline["exits"][0]["id"] if index == visits else None
+        )
+        instance["activityIds"] = [
+            f"Activity_{x}" for x in range(1 + index % 10, activities + 1, 10)
+        ]
+        timeline["instances"].append(instance)
+        timing = copy.deepcopy(anchor_template if index == 1 else timing_template)
+        timing["id"] = f"Timing_{index}"
+        timing["name"] = f"TIM{index}"
+        timing["value"] = f"P{index}D"
+        timing["relativeFromScheduledInstanceId"] = id
+        timing["relativeToScheduledInstanceId"] = "ScheduledActivityInstance_1"
+        timeline["timings"].append(timing)
+    timeline["entryId"] = "ScheduledActivityInstance_1"
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        study = USDM4().from_json(data).study
+    with open(EXTRA) as f:
+        extra = yaml.safe_load(f)
+    return study, timeline["id"], extra
+
+
+def timepoints(study, timeline_id: str, shared: bool):
+    errors = Errors()
+    design = study.first_version().studyDesigns[0]
+    timeline = design.find_timeline(timeline_id)
+    index = (
+        ActivityIndex(study, StudyContext(study).activity_list(), errors)
+        if shared
+        else None
+    )
+    for instance in timeline.instances:
+        TimepointPlanDefinitionFactory(study, design, instance, errors, index)
+
+
+def export(study, timeline_id: str, extra: dict, trusted: bool):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        exporter = ExportSoA(study, timeline_id, "uuid", extra, trusted=trusted)
+        message = exporter.to_message()
+    if exporter.errors.error_count():
+        raise RuntimeError(exporter.errors.dump(1))
+    return message
+
+
+def main(visits: int = 500, activities: int = 300, repeats: int = 3):
+    study, timeline_id, extra = synthetic(visits, activities)
+    print(f"{visits} visits x {activities} activities")
+    for name, function in [
+        (
+            "timepoints, index per factory",
+            lambda: timepoints(study, timeline_id, False),
+        ),
+        ("timepoints, shared index", lambda: timepoints(study, timeline_id, True)),
+        ("export, validated", lambda: export(study, timeline_id, extra, False)),
+        ("export, trusted", lambda: export(study, timeline_id, extra, True)),
+    ]:
+        seconds = min(timeit.repeat(function, number=1, repeat=repeats))
+        print(f"{name:<32} {seconds * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    args = [int(x) for x in sys.argv[1:4]]
+    main(*args)
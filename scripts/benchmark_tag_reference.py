@@ -0,0 +1,66 @@
+"""Benchmark the narrative text fast path of the PRISM3 export.
+
+Reports, for every PRISM3 test study, the share of narrative content items
+and eligibility criteria that contain no usdm:ref or usdm:tag elements and so
+skip the tag translation parse, the share of criteria returned untouched
+without any parse, and the export time with and without the fast path.
+
+Run from the repository root:
+
+    PYTHONPATH=src python scripts/benchmark_tag_reference.py [repeats]
+"""
+
+import sys
+import glob
+import json
+import timeit
+import warnings
+import yaml
+from unittest.mock import patch
+from usdm4 import USDM4
+from simple_error_log.errors import Errors
+from usdm4_fhir.m11.export.export_prism3 import ExportPRISM3
+from usdm4_fhir.m11.utility.tag_reference import TagReference
+
+FILES = "tests/usdm4_fhir/test_files/m11/export/prism3/*_usdm.json"
+
+
+def share(count: int, total: int) -> str:
+    return f"{count}/{total} ({count / total * 100 if total else 0:.0f}%)"
+
+
+def main(repeats: int = 5):
+    tag_ref = TagReference(None, Errors())
+    print(
+        f"{'file':<12} {'items no tags':>16} {'criteria no tags':>17} {'criteria plain':>15} {'parse all':>10} {'fast path':>10} {'gain':>5}"
+    )
+    for path in sorted(glob.glob(FILES)):
+        with open(path) as f, warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            study = USDM4().from_json(json.load(f)).study
+        with open(path.replace("_usdm.json", "_extra.yaml")) as f:
+            extra = yaml.safe_load(f)
+        items = [x.text for x in study.first_version().narrativeContentItems if x.text]
+        criteria = [
+            x.text for x in study.first_version().eligibilityCriterionItems if x.text
+        ]
+        items_no_tags = sum(not TagReference.has_tags(x) for x in items)
+        criteria_no_tags = sum(not TagReference.has_tags(x) for x in criteria)
+        criteria_plain = sum(tag_ref._is_plain(x) for x in criteria)
+
+        def export():
+            ExportPRISM3(study, extra).to_message()
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            with patch.object(TagReference, "has_tags", return_value=True):
+                with patch.object(TagReference, "_is_plain", return_value=False):
+                    old = min(timeit.repeat(export, number=1, repeat=repeats))
+            new = min(timeit.repeat(export, number=1, repeat=repeats))
+        print(
+            f"{path.split('/')[-1][:-10]:<12} {share(items_no_tags, len(items)):>16} {share(criteria_no_tags, len(criteria)):>17} {share(criteria_plain, len(criteria)):>15} {old * 1000:>8.1f}ms {new * 1000:>8.1f}ms {old / new:>4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,90 @@
+"""Benchmark trusted builds of the exports.
+
+Reports, for every export test study, the export time with every resource
+validated as it is built (the default), built without validation (trusted)
+and built without validation followed by the single validation pass over the
+finished bundle (trusted + validate). Also checks the trusted output is
+identical to the validated output.
+
+Run from the repository root:
+
+    PYTHONPATH=src python scripts/benchmark_trusted_build.py [repeats]
+"""
+
+import re
+import sys
+import glob
+import json
+import timeit
+import warnings
+import yaml
+from usdm4 import USDM4
+from usdm4_fhir.m11.export.export_madrid import ExportMadrid
+from usdm4_fhir.m11.export.export_prism2 import ExportPRISM2
+from usdm4_fhir.m11.export.export_prism3 import ExportPRISM3
+from usdm4_fhir.soa.export.export_soa import ExportSoA
+
+M11_FILES = "tests/usdm4_fhir/test_files/m11/export/*/*_usdm.json"
+SOA_FILES = "tests/usdm4_fhir/test_files/soa/export/*_usdm.json"
+EXPORTS = {"madrid": ExportMadrid, "prism2": ExportPRISM2, "prism3": ExportPRISM3}
+VARIABLE = re.compile(
+    r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}[+-]\d\d:\d\d|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
+
+
+def load(path: str):
+    with open(path) as f, warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        study = USDM4().from_json(json.load(f)).study
+    with open(path.replace("_usdm.json", "_extra.yaml")) as f:
+        extra = yaml.safe_load(f)
+    return study, extra
+
+
+def exporters():
+    for path in sorted(glob.glob(M11_FILES)):
+        study, extra = load(path)
+        version = path.split("/")[-2]
+        klass = EXPORTS[version]
+        yield (
+            f"{version}/{path.split('/')[-1][:-10]}",
+            lambda **kwargs: klass(study, extra, **kwargs),
+        )
+    for path in sorted(glob.glob(SOA_FILES)):
+        study, extra = load(path)
+        timeline = study.first_version().studyDesigns[0].main_timeline()
+        yield (
+            f"soa/{path.split('/')[-1][:-10]}",
+            lambda **kwargs: ExportSoA(study, timeline.id, "uuid", extra, **kwargs),
+        )
+
+
+def main(repeats: int = 5):
+    print(
+        f"{'file':<20} {'validated':>10} {'trusted':>10} {'+validate':>10} {'gain':>5} {'same':>5}"
+    )
+    for name, exporter in exporters():
+        results = {}
+
+        def export(**kwargs):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                return exporter(**kwargs).to_message()
+
+        for mode, kwargs in [
+            ("validated", {}),
+            ("trusted", {"trusted": True}),
+            ("validate", {"trusted": True, "validate": True}),
+        ]:
+            results[mode] = min(
+                timeit.repeat(lambda: export(**kwargs), number=1, repeat=repeats)
+            )
+        same = VARIABLE.sub("", export()) == VARIABLE.sub("", export(trusted=True))
+        validated, trusted, validate = results.values()
+        print(
+            f"{name:<20} {validated * 1000:>8.1f}ms {trusted * 1000:>8.1f}ms {validate * 1000:>8.1f}ms {validated / trusted:>4.1f}x {str(same):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -1,3 +1,5 @@
+from typing import AsyncIterator, Iterable, Iterator
+from concurrent.futures import Executor
 from usdm4 import USDM4
 from usdm4.api.wrapper import Wrapper
 from simple_error_log import Errors
@@ -6,8 +8,14 @@ from usdm4_fhir.soa.export.export_soa import ExportSoA
 from usdm4_fhir.m11.export.export_madrid import ExportMadrid
 from usdm4_fhir.m11.export.export_prism2 import ExportPRISM2
 from usdm4_fhir.m11.export.export_prism3 import ExportPRISM3
+from usdm4_fhir.m11.export import batch_export
+from usdm4_fhir.m11.export.batch_export import BatchResult, BatchStatistics
 from usdm4_fhir.m11.import_.import_prism2 import ImportPRISM2
 from usdm4_fhir.m11.import_.import_prism3 import ImportPRISM3
+from usdm4_fhir.m11.import_ import batch_import
+from usdm4_fhir.m11.import_.batch_import import ImportResult
+from usdm4_fhir.utility.study_context import StudyContext
+from usdm4_fhir.utility.bundle_reader import BundleSource
 
 
 class FHIRBase:
@@ -25,35 +33,86 @@ class M11(FHIRBase):
     def __init__(self):
         self._import = None
         self._export = None
+        self._statistics = None
 
     def to_message(
-        self, study: Study, extra: dict, version: str = PRISM2
+        self,
+        study: Study,
+        extra: dict,
+        version: str = PRISM2,
+        context: StudyContext = None,
+        workers: int = 0,
+        trusted: bool = False,
+        validate: bool = False,
     ) -> str | None:
+        klass = self._export_class(version)
+        self._export = klass(study, extra, context, workers, trusted, validate)
+        self._errors = self._export.errors
+        return self._export.to_message()
+
+    def to_messages(
+        self,
+        items: Iterable[tuple[Study, dict]],
+        version: str = PRISM2,
+        workers: int = 0,
+        trusted: bool = False,
+        validate: bool = False,
+    ) -> Iterator[BatchResult]:
+        """Exports many (study, extra) pairs, yielding a result, with the
+        message and the study's errors, for each as it finishes. Uses a pool
+        of processes if workers > 1. Throughput, from when the iteration
+        starts, is in statistics"""
+        klass = self._export_class(version)
+        self._statistics = BatchStatistics()
+        return batch_export.export(
+            klass, items, workers, trusted, validate, self._statistics
+        )
+
+    @property
+    def statistics(self) -> BatchStatistics | None:
+        return self._statistics
+
+    def _export_class(self, version: str):
         match version:
             case self.MADRID:
-                self._export = ExportMadrid(study, extra)
+                return ExportMadrid
             case self.PRISM2:
-                self._export = ExportPRISM2(study, extra)
+                return ExportPRISM2
             case self.PRISM3:
-                self._export = ExportPRISM3(study, extra)
+                return ExportPRISM3
             case _:
                 raise Exception(f"Version parameter '{version}' not recognized")
-        self._errors = self._export.errors
-        return self._export.to_message()
 
     async def from_message(
-        self, file_path: str, version: str = PRISM2
+        self, file_path: BundleSource, version: str = PRISM2, executor: Executor = None
     ) -> Wrapper | None:
+        self._import = self._import_class(version)()
+        self._errors = self._import.errors
+        result: Wrapper = await self._import.from_message(file_path, executor)
+        return result
+
+    def from_messages(
+        self,
+        file_paths: Iterable[BundleSource],
+        version: str = PRISM2,
+        concurrency: int = 4,
+        executor: Executor = None,
+    ) -> AsyncIterator[ImportResult]:
+        """Imports many messages (paths or any other BundleSource), at most
+        concurrency at a time, yielding a
+        result, with the wrapper and the message's errors, for each as it
+        completes. Use with 'async for'"""
+        klass = self._import_class(version)
+        return batch_import.import_messages(klass, file_paths, concurrency, executor)
+
+    def _import_class(self, version: str):
         match version:
             case self.PRISM2:
-                self._import = ImportPRISM2()
+                return ImportPRISM2
             case self.PRISM3:
-                self._import = ImportPRISM3()
+                return ImportPRISM3
             case _:
                 raise Exception(f"Version parameter '{version}' not recognized")
-        self._errors = self._import.errors
-        result: Wrapper = await self._import.from_message(file_path)
-        return result
 
     @property
     def errors(self) -> Errors:
@@ -62,9 +121,36 @@ class M11(FHIRBase):
 
 class SoA(FHIRBase):
     def to_message(
-        self, study: Study, timeline_id: str, uuid: str, extra: dict = {}
+        self,
+        study: Study,
+        timeline_id: str,
+        uuid: str,
+        extra: dict = {},
+        context: StudyContext = None,
+        trusted: bool = False,
+        validate: bool = False,
+    ) -> str | None:
+        self._export = ExportSoA(
+            study, timeline_id, uuid, extra, context, trusted, validate
+        )
+        return self._export.to_message()
+
+    def timelines_to_message(
+        self,
+        study: Study,
+        timeline_ids: list[str] | None,
+        uuid: str,
+        extra: dict = {},
+        context: StudyContext = None,
+        trusted: bool = False,
+        validate: bool = False,
     ) -> str | None:
-        self._export = ExportSoA(study, timeline_id, uuid, extra)
+        """Exports several timelines, all the design's if the ids are None,
+        in one bundle. The research study and activity definitions are in
+        the bundle once"""
+        self._export = ExportSoA(
+            study, timeline_ids, uuid, extra, context, trusted, validate
+        )
         return self._export.to_message()
 
     @property
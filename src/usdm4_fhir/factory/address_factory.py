@@ -21,6 +21,6 @@ class AddressFactory(BaseFactory):
                 result.pop("lines")
             if "country" in result:
                 result["country"] = address.country.decode
-            self.item = AddressType(**result)
+            self.item = self.build(AddressType, **result)
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -18,8 +18,8 @@ class AssociatedPartyFactory(BaseFactory):
                 display=kwargs["role_display"],
             )
             role = CodeableConceptFactory(errors=self._errors, coding=[code.item])
-            self.item = ResearchStudyAssociatedParty(
-                role=role.item, party=kwargs["party"]
+            self.item = self.build(
+                ResearchStudyAssociatedParty, role=role.item, party=kwargs["party"]
             )
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
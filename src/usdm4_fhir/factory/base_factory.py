@@ -1,13 +1,129 @@
 import re
+from typing import Iterable, Iterator
+from functools import cache, lru_cache
+from contextlib import contextmanager
+from contextvars import ContextVar
 from simple_error_log import Errors
-from simple_error_log.error_location import KlassMethodLocation
+from fhir.resources import get_fhir_model_class
+from pydantic.v1 import BaseModel, ValidationError
+from simple_error_log.error_location import ErrorLocation, KlassMethodLocation
+
+
+# Set by trusted_build, see BaseFactory.build
+_trusted: ContextVar[bool] = ContextVar("trusted_build", default=False)
+
+
+@contextmanager
+def trusted_build(trusted: bool = True):
+    """Within the context factories build FHIR resources without validation"""
+    token = _trusted.set(trusted)
+    try:
+        yield
+    finally:
+        _trusted.reset(token)
+
+
+def trusted_iter(iterator: Iterable, trusted: bool = True) -> Iterator:
+    """Advances the iterator within trusted_build. Unlike a with statement in
+    a generator the setting is not left in place while the consumer runs"""
+    iterator = iter(iterator)
+    while True:
+        with trusted_build(trusted):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def validated_json(resource, errors: Errors, location: ErrorLocation) -> str:
+    """The resource as json, checked by a single validation pass that parses
+    it back as the resource type. Failures are logged, the json is returned
+    regardless"""
+    text = resource.json()
+    try:
+        type(resource).parse_raw(text)
+    except ValidationError as e:
+        errors.error(f"FHIR validation failed, {e}", location)
+    return text
 
 
 class BaseFactory:
+    # Codes, systems, urls and the like repeat so their coerced values are
+    # cached in trusted builds, longer text (narrative) is not
+    COERCE_CACHE_LENGTH = 256
+
     def __init__(self, errors: Errors, **kwargs):
         self._errors = errors
         self.item = None
 
+    @classmethod
+    def build(cls, klass, **kwargs):
+        """Creates the FHIR resource, unvalidated in a trusted build"""
+        return cls._construct(klass, kwargs) if _trusted.get() else klass(**kwargs)
+
+    @classmethod
+    def _construct(cls, klass, values: dict):
+        # Nested dicts, and fhirtypes (dicts naming a model), become models of
+        # the field's type, as validation would. As pydantic's construct() but
+        # with the class' aliases and defaults worked out once (FHIR defaults
+        # are None or constants so can be shared)
+        if not hasattr(klass, "construct"):
+            klass = cls._model_class(klass)
+        fields, aliases, defaults = cls._schema(klass)
+        result = dict(defaults)
+        fields_set = set()
+        for name, value in values.items():
+            name = aliases.get(name, name)
+            field = fields[name]
+            if isinstance(value, list):
+                item = field.sub_fields[0] if field.sub_fields else field
+                value = [cls._construct_value(klass, item, x) for x in value]
+            else:
+                value = cls._construct_value(klass, field, value)
+            result[name] = value
+            fields_set.add(name)
+        model = klass.__new__(klass)
+        object.__setattr__(model, "__dict__", result)
+        object.__setattr__(model, "__fields_set__", fields_set)
+        model._init_private_attributes()
+        return model
+
+    @staticmethod
+    @cache
+    def _schema(klass) -> tuple[dict, dict, dict]:
+        fields = klass.__fields__
+        aliases = {x.alias: name for name, x in fields.items()}
+        defaults = {
+            name: x.get_default() for name, x in fields.items() if not x.required
+        }
+        return fields, aliases, defaults
+
+    @classmethod
+    def _construct_value(cls, klass, field, value):
+        # Models are trusted as built, primitives are still coerced by the
+        # field so the output is as validated
+        if isinstance(value, dict):
+            return cls._construct(cls._model_class(field.type_), value)
+        if value is None or isinstance(value, BaseModel):
+            return value
+        if isinstance(value, str) and len(value) > cls.COERCE_CACHE_LENGTH:
+            return cls._coerce.__wrapped__(klass, field, value)
+        return cls._coerce(klass, field, value)
+
+    @staticmethod
+    @lru_cache(maxsize=4096, typed=True)
+    def _coerce(klass, field, value):
+        value, error = field.validate(value, {}, loc=field.alias, cls=klass)
+        if error:
+            raise ValidationError([error], klass)
+        return value
+
+    @staticmethod
+    def _model_class(field_type):
+        # Field types are fhirtypes that name the model class
+        return get_fhir_model_class(field_type.__resource_type__)
+
     def handle_exception(self, module: str, method: str, e: Exception):
         self.item = None
         self._errors.exception(
@@ -0,0 +1,31 @@
+from collections.abc import Hashable
+from simple_error_log import Errors
+from simple_error_log.error_location import KlassMethodLocation
+
+
+class CanonicalRegistry:
+    """The canonical URLs given out by an export. An identical definition
+    reuses the URL it was given before, a different definition that would
+    share a URL is given a unique one, the URL with a suffix"""
+
+    MODULE = "usdm4_fhir.factory.canonical_registry.CanonicalRegistry"
+
+    def __init__(self, errors: Errors):
+        self._errors = errors
+        self._definitions: dict[str, Hashable] = {}
+
+    def register(self, url: str, definition: Hashable, suffix: str) -> tuple[str, bool]:
+        """Returns the URL for the definition and whether it is new, False
+        if the same definition was registered with the URL before"""
+        existing = self._definitions.get(url)
+        if existing is None:
+            self._definitions[url] = definition
+            return url, True
+        if existing == definition:
+            return url, False
+        unique = f"{url}-{suffix}"
+        self._errors.warning(
+            f"Canonical URL '{url}' already used by a different definition, using '{unique}'",
+            KlassMethodLocation(self.MODULE, "register"),
+        )
+        return self.register(unique, definition, suffix)
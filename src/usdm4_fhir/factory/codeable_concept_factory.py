@@ -9,6 +9,6 @@ class CodeableConceptFactory(BaseFactory):
     def __init__(self, errors: Errors, **kwargs):
         try:
             super().__init__(errors, **kwargs)
-            self.item = CodeableConcept(**kwargs)
+            self.item = self.build(CodeableConcept, **kwargs)
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -15,6 +15,6 @@ class CodingFactory(BaseFactory):
                 kwargs["code"] = kwargs["usdm_code"].code
                 kwargs["display"] = kwargs["usdm_code"].decode
                 kwargs.pop("usdm_code")
-            self.item = Coding(**kwargs)
+            self.item = self.build(Coding, **kwargs)
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -9,6 +9,6 @@ class CompositionFactory(BaseFactory):
     def __init__(self, errors: Errors, **kwargs):
         try:
             super().__init__(errors, **kwargs)
-            self.item = Composition(**kwargs)
+            self.item = self.build(Composition, **kwargs)
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -12,7 +12,7 @@ class ExtensionFactory(BaseFactory):
             kwargs["extension"] = (
                 [] if "extension" not in kwargs else kwargs["extension"]
             )
-            self.item = Extension(**kwargs)
+            self.item = self.build(Extension, **kwargs)
         except Exception as e:
             self._errors.info(f"Failed to create extension using kwarg '{kwargs}'")
             self.handle_exception(self.MODULE, "__init__", e)
@@ -9,6 +9,6 @@ class HumanNameFactory(BaseFactory):
     def __init__(self, errors: Errors, **kwargs):
         try:
             super().__init__(errors, **kwargs)
-            self.item = HumanName(**kwargs)
+            self.item = self.build(HumanName, **kwargs)
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -1,21 +1,66 @@
 import re
+from decimal import Decimal
+from functools import lru_cache
 
 
 class ISO8601ToUCUM:
+    SYSTEM = "http://unitsofmeasure.org"
+    CACHE_SIZE = 1024
+
+    # The duration designators in order, the unit each is converted to and
+    # the size of that unit in seconds. Months and years are the UCUM mean
+    # (Julian) month and year
+    UNITS = [
+        ("Y", "y", Decimal(31557600)),
+        ("M", "m", Decimal(2629800)),
+        ("W", "w", Decimal(604800)),
+        ("D", "d", Decimal(86400)),
+        ("TH", "h", Decimal(3600)),
+        ("TM", "min", Decimal(60)),
+        ("TS", "s", Decimal(1)),
+    ]
+    _NUMBER = r"(\d+(?:[.,]\d+)?)"
+    DURATION = re.compile(
+        rf"^P(?:{_NUMBER}Y)?(?:{_NUMBER}M)?(?:{_NUMBER}W)?(?:{_NUMBER}D)?"
+        rf"(?:T(?:{_NUMBER}H)?(?:{_NUMBER}M)?(?:{_NUMBER}S)?)?$"
+    )
+
     @classmethod
     def convert(cls, value: str) -> dict:
         """Converts an ISO8601 duration value to the equivalent UCUM value.
-        Returns a dictionary with fields 'value', 'code' and 'system'
+        Returns a dictionary with fields 'value', 'unit' and 'system', empty
+        if the value is not a duration. Durations with several components
+        are normalised to the smallest unit present (days, rather than
+        weeks, if mixed with months or years), e.g. P1DT12H is 36 h
         """
-        result = {}
-        match = re.search(r"^P(?P<value>\d+)(?P<unit>[Y|M|W|D])", value)
-        if match:
-            result = match.groupdict()
-            result["unit"] = result["unit"].lower()
-            result["system"] = "http://unitsofmeasure.org"
-        match = re.search(r"^PT(?P<value>\d+)H", value)
-        if match:
-            result = match.groupdict()
-            result["unit"] = "h"
-            result["system"] = "http://unitsofmeasure.org"
-        return result
+        result = cls._convert(value) if isinstance(value, str) else None
+        return dict(result) if result else {}
+
+    @staticmethod
+    @lru_cache(maxsize=CACHE_SIZE)
+    def _convert(value: str) -> tuple | None:
+        # Cached as timelines repeat the same few values, a tuple so the
+        # cached result can't be altered by a caller
+        match = ISO8601ToUCUM.DURATION.match(value)
+        if not match:
+            return None
+        components = [
+            (Decimal(number.replace(",", ".")), unit)
+            for number, unit in zip(match.groups(), ISO8601ToUCUM.UNITS)
+            if number is not None
+        ]
+        if not components:
+            return None
+        if len(components) == 1:
+            number, (_, code, _) = components[0]
+        else:
+            seconds = sum(number * size for number, (_, _, size) in components)
+            _, code, size = components[-1][1]
+            if code == "w":
+                _, code, size = ISO8601ToUCUM.UNITS[3]
+            number = seconds / size
+        return (
+            ("value", format(number.normalize(), "f")),
+            ("unit", code),
+            ("system", ISO8601ToUCUM.SYSTEM),
+        )
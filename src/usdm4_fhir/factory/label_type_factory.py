@@ -13,6 +13,8 @@ class LabelTypeFactory(BaseFactory):
             super().__init__(errors, **kwargs)
             coding = CodingFactory(errors=self._errors, usdm_code=kwargs["usdm_code"])
             type = CodeableConceptFactory(errors=self._errors, coding=[coding.item])
-            self.item = ResearchStudyLabelType(type=type.item, value=kwargs["text"])
+            self.item = self.build(
+                ResearchStudyLabelType, type=type.item, value=kwargs["text"]
+            )
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -16,8 +16,11 @@ class OrganizationFactory(BaseFactory):
                 errors=self._errors, address=organization.legalAddress
             )
             name = organization.label if organization.label else organization.name
-            self.item = FHIROrganization(
-                id=str(uuid4()), name=name, contact=[{"address": address.item}]
+            self.item = self.build(
+                FHIROrganization,
+                id=str(uuid4()),
+                name=name,
+                contact=[{"address": address.item}],
             )
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -11,6 +11,6 @@ class PlanDefinitionActionFactory(BaseFactory):
     def __init__(self, errors: Errors, **kwargs):
         try:
             super().__init__(errors, **kwargs)
-            self.item = PlanDefinitionAction(**kwargs)
+            self.item = self.build(PlanDefinitionAction, **kwargs)
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -9,6 +9,6 @@ class PlanDefinitionRelatedActionFactory(BaseFactory):
     def __init__(self, errors: Errors, **kwargs):
         try:
             super().__init__(errors, **kwargs)
-            self.item = PlanDefinitionActionRelatedAction(**kwargs)
+            self.item = self.build(PlanDefinitionActionRelatedAction, **kwargs)
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -13,6 +13,8 @@ class PractionerFactory(BaseFactory):
         try:
             super().__init__(errors, **{})
             human_name = HumanNameFactory(errors, text=person.name)
-            self.item = Practitioner(id=str(uuid4()), name=[human_name.item])
+            self.item = self.build(
+                Practitioner, id=str(uuid4()), name=[human_name.item]
+            )
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -18,8 +18,10 @@ class ProgressStatusFactory(BaseFactory):
                 display=kwargs["state_display"],
             )
             state = CodeableConceptFactory(errors=self._errors, coding=[code.item])
-            self.item = ResearchStudyProgressStatus(
-                state=state.item, period={"start": kwargs["value"]}
+            self.item = self.build(
+                ResearchStudyProgressStatus,
+                state=state.item,
+                period={"start": kwargs["value"]},
             )
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
@@ -26,7 +26,8 @@ class ResearchStudyFactory(BaseFactory):
             self._organizations: dict = self._version.organization_map()
 
             # Base instance
-            self.item = ResearchStudy(
+            self.item = self.build(
+                ResearchStudy,
                 status="active",
                 identifier=[],
                 extension=[],
@@ -46,7 +46,8 @@ class ResearchStudyFactoryP3(BaseFactory):
             }
 
             # Base instance
-            self.item = ResearchStudy(
+            self.item = self.build(
+                ResearchStudy,
                 id=str(uuid4()),
                 meta=meta,
                 status="active",
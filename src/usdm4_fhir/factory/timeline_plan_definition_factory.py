@@ -1,4 +1,5 @@
 from simple_error_log import Errors
+from simple_error_log.error_location import KlassMethodLocation
 from usdm4_fhir.factory.base_factory import BaseFactory
 from usdm4_fhir.factory.plan_definition_factory import PlanDefinitionFactory
 from usdm4_fhir.factory.identifier_factory import IdentifierFactory
@@ -23,6 +24,19 @@ from usdm4_fhir.factory.cdisc_fhir import CDISCFHIR
 from usdm4_fhir.factory.study_url import StudyUrl
 
 
+class TimingIndex:
+    """The timings of a timeline indexed, in a single pass, by the instance
+    they are from (the first timing wins, as the timeline's find_timing_from)"""
+
+    def __init__(self, timeline: ScheduleTimeline):
+        self._from: dict[str, Timing] = {}
+        for timing in timeline.timings:
+            self._from.setdefault(timing.relativeFromScheduledInstanceId, timing)
+
+    def timing_from(self, id: str) -> Timing | None:
+        return self._from.get(id)
+
+
 class TimelinePlanDefinitionFactory(BaseFactory):
     MODULE = "usdm4_fhir.factory.timeline_plan_definition_factory.TimelinePlanDefinitionFactory"
 
@@ -66,6 +80,7 @@ class TimelinePlanDefinitionFactory(BaseFactory):
 
     def _actions(self, timeline: ScheduleTimeline, base_url: str) -> list:
         results = []
+        timings = TimingIndex(timeline)
         timepoints = timeline.timepoint_list()
         for timepoint in timepoints:
             action = PlanDefinitionActionFactory(
@@ -76,17 +91,23 @@ class TimelinePlanDefinitionFactory(BaseFactory):
                 definitionCanonical=f"{base_url}/PlanDefinition/{self.fix_id(timepoint.name)}",
                 relatedAction=[],
             )
-            if ra := self._related_action(timeline, timepoint):
+            if ra := self._related_action(timings, timepoint):
                 action.item.relatedAction.append(ra)
             results.append(action.item)
         return results
 
     def _related_action(
         self,
-        timeline: ScheduleTimeline,
+        timings: TimingIndex,
         timepoint: ScheduledDecisionInstance | ScheduledActivityInstance,
     ) -> dict | None:
-        timing: Timing = timeline.find_timing_from(timepoint.id)
+        timing: Timing = timings.timing_from(timepoint.id)
+        if timing is None:
+            self._errors.error(
+                f"No timing found from timepoint '{timepoint.id}', no related action added",
+                KlassMethodLocation(self.MODULE, "_related_action"),
+            )
+            return None
         if timing.type.decode == "Fixed Reference":
             return None
         offset = ISO8601ToUCUM.convert(timing.value)
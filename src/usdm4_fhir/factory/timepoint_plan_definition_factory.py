@@ -7,12 +7,59 @@ from usdm4_fhir.factory.plan_definition_action_factory import (
     PlanDefinitionActionFactory,
 )
 from usdm4.api.study import Study
+from usdm4.api.activity import Activity
 from usdm4.api.study_design import StudyDesign
 from usdm4.api.scheduled_instance import (
     ScheduledActivityInstance,
     ScheduledDecisionInstance,
 )
 from usdm4_fhir.factory.study_url import StudyUrl
+from usdm4_fhir.factory.canonical_registry import CanonicalRegistry
+
+
+class ActivityIndex:
+    """What the timepoint plan definitions of a study share, built once and
+    passed to each factory: the base url, the plan definition type and, by
+    activity id, the id, title and canonical url of the activity's action.
+    The canonical urls come from the registry, activities with identical
+    definitions share one and definitions lists the activities to define"""
+
+    def __init__(
+        self,
+        study: Study,
+        activities: list[Activity],
+        errors: Errors,
+        registry: CanonicalRegistry = None,
+    ):
+        registry = registry if registry else CanonicalRegistry(errors)
+        self.base_url = StudyUrl.generate(study)
+        self.plan_type = CodeableConceptFactory(
+            errors=errors,
+            coding=[
+                CodingFactory(
+                    errors=errors,
+                    code="clinical-protocol",
+                    system="http://terminology.hl7.org/CodeSystem/plan-definition-type",
+                ).item
+            ],
+        ).item
+        self.canonical: dict[str, str] = {}
+        self.definitions: list[Activity] = []
+        self.actions: dict[str, dict] = {}
+        for x in activities:
+            url, new = registry.register(
+                f"{self.base_url}/ActivityDefinition/{BaseFactory.fix_id(x.name)}",
+                (x.name, x.label_name(), x.description),
+                BaseFactory.fix_id(x.id),
+            )
+            if new:
+                self.definitions.append(x)
+            self.canonical[x.id] = url
+            self.actions[x.id] = {
+                "id": BaseFactory.fix_id(x.id),
+                "title": x.label_name(),
+                "definitionCanonical": url,
+            }
 
 
 class TimepointPlanDefinitionFactory(BaseFactory):
@@ -24,50 +71,39 @@ class TimepointPlanDefinitionFactory(BaseFactory):
         study_design: StudyDesign,
         timepoint: ScheduledDecisionInstance | ScheduledActivityInstance,
         errors: Errors,
+        index: ActivityIndex = None,
     ):
         try:
             super().__init__(errors, **{})
-            base_url = StudyUrl.generate(study)
+            index = (
+                index
+                if index
+                else ActivityIndex(study, study_design.activity_list(), self._errors)
+            )
             self.item = PlanDefinitionFactory(
                 errors=self._errors,
                 id=self.fix_id(timepoint.id),
                 title=timepoint.label_name(),
-                type=CodeableConceptFactory(
-                    errors=self._errors,
-                    coding=[
-                        CodingFactory(
-                            errors=self._errors,
-                            code="clinical-protocol",
-                            system="http://terminology.hl7.org/CodeSystem/plan-definition-type",
-                        ).item
-                    ],
-                ).item,
+                type=index.plan_type,
                 #       date=
                 #       version=
                 purpose=timepoint.description,
                 status="active",
-                url=f"{base_url}/PlanDefinition/{self.fix_id(timepoint.name)}",
-                action=self._actions(study_design, timepoint, base_url),
+                url=f"{index.base_url}/PlanDefinition/{self.fix_id(timepoint.name)}",
+                action=self._actions(timepoint, index),
             ).item
         except Exception as e:
             self.handle_exception(self.MODULE, "__init__", e)
 
     def _actions(
         self,
-        study_design: StudyDesign,
         timepoint: ScheduledDecisionInstance | ScheduledActivityInstance,
-        base_url: str,
+        index: ActivityIndex,
     ) -> list:
         results = []
-        activity_list = study_design.activity_list()
-        activities = {v.id: v for v in activity_list}
         for id in timepoint.activityIds:
-            activity = activities[id]
             action = PlanDefinitionActionFactory(
-                errors=self._errors,
-                id=self.fix_id(activity.id),
-                title=activity.label_name(),
-                definitionCanonical=f"{base_url}/ActivityDefinition/{self.fix_id(activity.name)}",
+                errors=self._errors, **index.actions[id]
             )
             results.append(action.item)
         return results
@@ -0,0 +1,176 @@
+import time
+from collections import deque
+from typing import Iterable, Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from usdm4.api.study import Study
+from simple_error_log.errors import Errors
+from simple_error_log.error_location import KlassMethodLocation
+
+MODULE = "usdm4_fhir.m11.export.batch_export"
+
+
+class BatchResult:
+    """The outcome of exporting one study of a batch, index is the study's
+    position in the batch"""
+
+    def __init__(self, index: int, message: str | None, errors: Errors, seconds: float):
+        self.index = index
+        self.message = message
+        self.errors = errors
+        self.seconds = seconds
+
+    @property
+    def failed(self) -> bool:
+        return self.message is None
+
+
+class BatchStatistics:
+    """Aggregate throughput of a batch, updated as the results arrive"""
+
+    def __init__(self):
+        self.studies = 0
+        self.failed = 0
+        self.seconds = 0.0
+        self._start = None
+
+    def start(self) -> None:
+        # Timed from when the batch starts running, not when it was created
+        if self._start is None:
+            self._start = time.perf_counter()
+
+    def add(self, result: BatchResult) -> None:
+        self.start()
+        self.studies += 1
+        self.failed += 1 if result.failed else 0
+        self.seconds = time.perf_counter() - self._start
+
+    @property
+    def per_second(self) -> float:
+        return self.studies / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "studies": self.studies,
+            "failed": self.failed,
+            "seconds": self.seconds,
+            "per_second": self.per_second,
+        }
+
+
+def export(
+    klass,
+    items: Iterable[tuple[Study, dict]],
+    workers: int = 0,
+    trusted: bool = False,
+    validate: bool = False,
+    statistics: BatchStatistics = None,
+) -> Iterator[BatchResult]:
+    """Exports each (study, extra) pair with the exporter class, yielding the
+    results as they finish. In a process pool if workers > 1, otherwise in
+    turn. A study that fails is reported in its result, with the exception in
+    its errors, and the batch continues"""
+    statistics = statistics if statistics else BatchStatistics()
+    statistics.start()
+    if workers > 1:
+        results = _pool(klass, items, workers, trusted, validate)
+    else:
+        results = (
+            _export(klass, index, study, extra, trusted, validate)
+            for index, (study, extra) in enumerate(items)
+        )
+    for result in results:
+        statistics.add(result)
+        yield result
+
+
+def _pool(
+    klass, items, workers: int, trusted: bool, validate: bool
+) -> Iterator[BatchResult]:
+    # Studies are submitted as others finish, at most two per worker are in
+    # flight, so a large batch is never held in memory. A worker that dies
+    # breaks the pool, failing every study in flight. The pool is replaced
+    # and those studies are retried one at a time, so only the study that
+    # kills a worker on its own fails and the batch continues
+    items = enumerate(items)
+    pending: dict[Future, tuple[int, Study, dict, ProcessPoolExecutor, bool]] = {}
+    suspects: deque[tuple[int, Study, dict]] = deque()
+    executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(index: int, study: Study, extra: dict, alone: bool) -> None:
+        nonlocal executor
+        try:
+            future = executor.submit(
+                _export, klass, index, study, extra, trusted, validate
+            )
+        except BrokenProcessPool:
+            # Broken since the last results were collected, the studies in
+            # flight are retried when their results arrive
+            executor = _replace(executor, workers)
+            future = executor.submit(
+                _export, klass, index, study, extra, trusted, validate
+            )
+        pending[future] = (index, study, extra, executor, alone)
+
+    try:
+        while True:
+            if suspects:
+                if not pending:
+                    submit(*suspects.popleft(), True)
+            else:
+                for index, (study, extra) in items:
+                    submit(index, study, extra, False)
+                    if len(pending) >= workers * 2:
+                        break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, study, extra, submitted_to, alone = pending.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool as e:
+                    if submitted_to is executor:
+                        executor = _replace(executor, workers)
+                    if alone:
+                        yield _failed(index, e, "_pool")
+                    else:
+                        suspects.append((index, study, extra))
+                except Exception as e:
+                    # The result could not be returned
+                    yield _failed(index, e, "_pool")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _replace(executor: ProcessPoolExecutor, workers: int) -> ProcessPoolExecutor:
+    executor.shutdown(wait=False, cancel_futures=True)
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def _export(
+    klass, index: int, study: Study, extra: dict, trusted: bool, validate: bool
+):
+    start = time.perf_counter()
+    try:
+        exporter = klass(study, extra, trusted=trusted, validate=validate)
+        message = exporter.to_message()
+    except Exception as e:
+        return _failed(index, e, "_export", start)
+    return BatchResult(index, message, exporter.errors, time.perf_counter() - start)
+
+
+def _failed(index: int, e: Exception, method: str, start: float = None) -> BatchResult:
+    errors = Errors()
+    errors.exception(
+        "Exception raised exporting study in batch",
+        e,
+        KlassMethodLocation(MODULE, method),
+    )
+    seconds = time.perf_counter() - start if start else 0.0
+    return BatchResult(index, None, errors, seconds)
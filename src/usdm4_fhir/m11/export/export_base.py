@@ -1,13 +1,18 @@
 import datetime
+from typing import Iterator
 from usdm4.api.study import Study
 from usdm4.api.narrative_content import NarrativeContent, NarrativeContentItem
 from usdm4.api.study_version import StudyVersion
-from usdm4_fhir.utility.data_store import DataStore
+from usdm4_fhir.utility.study_context import StudyContext
 from usdm4_fhir.m11.utility.tag_reference import TagReference
+from usdm4_fhir.m11.export import section_renderer
+from usdm4_fhir.factory.base_factory import BaseFactory, validated_json
+from usdm4_fhir.utility.bundle_writer import BundleWriter
 
 from fhir.resources.composition import CompositionSection
 from fhir.resources.narrative import Narrative
 from fhir.resources.codeableconcept import CodeableConcept
+from bs4 import BeautifulSoup, NavigableString, Tag
 from usdm4_fhir.m11.utility.soup import get_soup
 from simple_error_log.errors import Errors
 from simple_error_log.error_location import KlassMethodLocation
@@ -20,39 +25,95 @@ class ExportBase:
     class LogicError(Exception):
         pass
 
-    def __init__(self, study: Study, extra: dict):
+    def __init__(
+        self,
+        study: Study,
+        extra: dict,
+        context: StudyContext = None,
+        workers: int = 0,
+        trusted: bool = False,
+        validate: bool = False,
+    ):
         self.study = study
         self._uuid = study.id
-        self._data_store = DataStore(study)
+        self._errors = Errors()
+        self._context = StudyContext.for_study(
+            study, context, self._errors, KlassMethodLocation(self.MODULE, "__init__")
+        )
+        self._data_store = self._context.data_store
         self._extra = extra
+        # Render sections in a pool of this many processes, sequential if < 2
+        self._workers = workers
+        # Build the resources without validation (see trusted_build) and, if
+        # set, validate the finished bundle once
+        self._trusted = trusted
+        self._validate = validate
         self._title_page = extra["title_page"]
         self._miscellaneous = extra["miscellaneous"]
         self._amendment = extra["amendment"]
-        self._errors = Errors()
         self._now = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
         self.study_version: StudyVersion = study.first_version()
         self.study_design = self.study_version.studyDesigns[0]
         self.protocol_document_version = self.study.documentedBy[0].versions[0]
         self.tag_ref = TagReference(self._data_store, self._errors)
-        self._nc_map = self.protocol_document_version.narrative_content_map()
-        self._nci_map = self.study_version.narrative_content_item_map()
+        self._nc_map = self._context.narrative_content_map()
+        self._nci_map = self._context.narrative_content_item_map()
 
     @property
     def errors(self) -> Errors:
         return self._errors
 
+    def _log_to(self, errors: Errors) -> None:
+        # Errors logged from now on go to the log given
+        self._errors = errors
+        self.tag_ref._errors = errors
+
     def _process_sections(self) -> list:
-        sections = []
+        sections = self._render_contents("_content_to_section", self._section_roots())
+        return [x for x in sections if x]
+
+    def _section_roots(self) -> list[NarrativeContent]:
+        # The top level contents, those not processed as part of an earlier
+        # content's subtree. The subtrees are marked without rendering them
+        roots = []
         processed_map = {}
         content = self.protocol_document_version.contents[0]
-        more = True
-        while more:
-            section = self._content_to_section(content, processed_map)
-            if section:
-                sections.append(section)
+        while content:
+            roots.append(content)
+            self._mark_processed(content, processed_map)
             content = self._next_narrative_content(content, processed_map)
-            more = True if content else False
-        return sections
+        return roots
+
+    def _mark_processed(self, content: NarrativeContent, map: dict) -> None:
+        # Marks the contents _content_to_section processes for the content
+        map[content.id] = True
+        for id in content.childIds:
+            self._mark_processed(self._nc_map[id], map)
+
+    def _render_contents(self, method: str, contents: list[NarrativeContent]) -> list:
+        return list(self._iter_contents(method, contents))
+
+    def _iter_contents(self, method: str, contents: list[NarrativeContent]) -> Iterator:
+        # Calls the method, with a shared processed map, for each content.
+        # Sequentially each result is yielded as soon as it is rendered, so a
+        # streamed message holds one at a time. Each content is rendered
+        # independently so, if workers are set, they are rendered in a process
+        # pool with the results (and errors) merged back in content order
+        if self._workers > 1 and len(contents) > 1:
+            yield from section_renderer.render(self, method, contents, self._workers)
+            return
+        processed_map = {}
+        for content in contents:
+            yield getattr(self, method)(content, processed_map)
+
+    def _bundle_json(self, bundle) -> str:
+        if not self._validate:
+            return bundle.json()
+        location = KlassMethodLocation(self.MODULE, "to_message")
+        return validated_json(bundle, self._errors, location)
+
+    def _bundle_writer(self, bundle) -> BundleWriter:
+        return BundleWriter(bundle, self._errors if self._validate else None)
 
     def _next_narrative_content(
         self, content: NarrativeContent, map: dict
@@ -77,14 +138,14 @@ class ExportBase:
         if content.sectionNumber in ignore_list:
             return None
         processed_map[content.id] = True
-        div = self._narrative_content_item(content)
-        text = str(div)
-        text = self._remove_line_feeds(text)
-        narrative = Narrative(status="generated", div=text)
+        text, div = self._narrative_content_div(content)
+        narrative = BaseFactory.build(Narrative, status="generated", div=div)
         title = self._format_section_title(content.sectionTitle)
-        code = CodeableConcept(text=f"section{content.sectionNumber}-{title}")
+        code = BaseFactory.build(
+            CodeableConcept, text=f"section{content.sectionNumber}-{title}"
+        )
         title = content.sectionTitle if content.sectionTitle else ""
-        section = self._composition_section(f"{title}", code, narrative)
+        section = self._composition_section(f"{title}", code, narrative, text)
         if self._composition_section_no_text(section) and not content.childIds:
             return None
         else:
@@ -96,9 +157,34 @@ class ExportBase:
         # print(f"IGNORE2: '{content.sectionNumber}' in {text} {len(section.section)}?")
         return section if text != self.EMPTY_DIV or section.section else None
 
-    def _narrative_content_item(self, content: NarrativeContent) -> str:
+    def _narrative_content_div(
+        self, content: NarrativeContent
+    ) -> tuple[str | None, str]:
+        # Single parse pipeline. The item text is parsed once, references are
+        # expanded and the tags cleaned in the same tree which is serialized
+        # once. Returns the div before cleaning, only when trivially short
+        # (see _short_div), and the cleaned div
         nci: NarrativeContentItem = self._nci_map[content.contentItemId]
-        return self.tag_ref.translate(nci, nci.text) if nci else ""
+        text = nci.text if nci and nci.text else ""
+        soup = get_soup(text, self._errors)
+        if TagReference.has_tags(text):
+            soup = self.tag_ref.translate_soup(nci, soup)
+        short_div = self._short_div(soup)
+        soup = self._clean_soup(soup)
+        return short_div, self._remove_line_feeds(str(soup))
+
+    def _short_div(self, soup: BeautifulSoup) -> str | None:
+        # The uncleaned div is only compared with the empty div and
+        # '&amp;nbsp', so it is only serialized when it holds at most one node
+        # (ignoring line feeds) without child tags
+        nodes = [
+            x
+            for x in soup.contents
+            if type(x) is not NavigableString or x.replace("\n", "")
+        ]
+        if len(nodes) > 1 or (nodes and isinstance(nodes[0], Tag) and nodes[0].find()):
+            return None
+        return self._remove_line_feeds(str(soup))
 
     def _format_section_title(self, title: str) -> str:
         return title.lower().strip().replace(" ", "-")
@@ -115,21 +201,22 @@ class ExportBase:
         return section.text is None
 
     # Factory
-    def _composition_section(self, title, code, narrative: Narrative):
-        if narrative.div == "&amp;nbsp":
+    def _composition_section(self, title, code, narrative: Narrative, text=None):
+        # The narrative div is already cleaned, text is the div before cleaning
+        if text == "&amp;nbsp":
             narrative.div = self.EMPTY_DIV
-        narrative.div = self._clean_tags(narrative.div)
         if narrative.div == self.EMPTY_DIV:
             title = title if title else "-"
-            return CompositionSection(title=f"{title}", code=code, section=[])
+            return BaseFactory.build(
+                CompositionSection, title=f"{title}", code=code, section=[]
+            )
         else:
             title = title if title else "-"
-            return CompositionSection(
-                title=title, code=code, text=narrative, section=[]
+            return BaseFactory.build(
+                CompositionSection, title=title, code=code, text=narrative, section=[]
             )
 
-    def _clean_tags(self, content):
-        soup = get_soup(content, self._errors)
+    def _clean_soup(self, soup: BeautifulSoup) -> BeautifulSoup:
         # 'ol' tag with 'type' attribute
         for ref in soup("ol"):
             try:
@@ -168,4 +255,4 @@ class ExportBase:
                 self._errors.exception(
                     "Exception raised cleaning empty 'p' tags", e, location
                 )
-        return str(soup)
+        return soup
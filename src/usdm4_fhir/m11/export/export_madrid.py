@@ -5,7 +5,7 @@ from usdm4_fhir.m11.export.export_base import ExportBase
 from simple_error_log.error_location import KlassMethodLocation
 
 from simple_error_log import Errors
-from usdm4_fhir.factory.base_factory import BaseFactory
+from usdm4_fhir.factory.base_factory import BaseFactory, trusted_build
 from usdm4_fhir.factory.research_study_factory import ResearchStudyFactory
 from usdm4_fhir.factory.codeable_concept_factory import CodeableConceptFactory
 from usdm4_fhir.factory.reference_factory import ReferenceFactory
@@ -25,41 +25,44 @@ class ExportMadrid(ExportBase):
 
     def to_message(self) -> str | None:
         try:
-            self._errors = Errors()
-            self._entries = []
-            date = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
-
-            # Composition
-            # composition = self._composition_entry(date)
-            # self._add_bundle_entry(
-            #    composition, "https://www.example.com/Composition/1234B"
-            # )
-
-            # Research Study
-            rs = ResearchStudyFactory(self.study, self._errors, self._extra)
-            self._add_bundle_entry(rs, "https://www.example.com/Composition/1234A")
-
-            # IE
-            ie = self._inclusion_exclusion_critieria()
-            self._add_bundle_entry(ie, "https://www.example.com/Composition/1234X1")
-            rs.item.recruitment = {"eligibility": {"reference": f"Group/{ie.item.id}"}}
-
-            # Final bundle
-            identifier = IdentifierFactory(
-                errors=self._errors,
-                system="urn:ietf:rfc:3986",
-                value=f"urn:uuid:{self.study.id}",
-            )
-            bundle = BundleFactory(
-                errors=self._errors,
-                id=None,
-                entry=self._entries,
-                # type="document", # With composition
-                type="collection",  # Without composition
-                identifier=identifier.item,
-                timestamp=date,
-            )
-            return bundle.item.json()
+            with trusted_build(self._trusted):
+                self._errors = Errors()
+                self._entries = []
+                date = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
+
+                # Composition
+                # composition = self._composition_entry(date)
+                # self._add_bundle_entry(
+                #    composition, "https://www.example.com/Composition/1234B"
+                # )
+
+                # Research Study
+                rs = ResearchStudyFactory(self.study, self._errors, self._extra)
+                self._add_bundle_entry(rs, "https://www.example.com/Composition/1234A")
+
+                # IE
+                ie = self._inclusion_exclusion_critieria()
+                self._add_bundle_entry(ie, "https://www.example.com/Composition/1234X1")
+                rs.item.recruitment = {
+                    "eligibility": {"reference": f"Group/{ie.item.id}"}
+                }
+
+                # Final bundle
+                identifier = IdentifierFactory(
+                    errors=self._errors,
+                    system="urn:ietf:rfc:3986",
+                    value=f"urn:uuid:{self.study.id}",
+                )
+                bundle = BundleFactory(
+                    errors=self._errors,
+                    id=None,
+                    entry=self._entries,
+                    # type="document", # With composition
+                    type="collection",  # Without composition
+                    identifier=identifier.item,
+                    timestamp=date,
+                )
+            return self._bundle_json(bundle.item)
         except Exception as e:
             self._errors.exception(
                 "Exception raised generating FHIR content.",
@@ -102,7 +105,7 @@ class ExportMadrid(ExportBase):
 
     def _inclusion_exclusion_critieria(self):
         design = self.study_design
-        criteria = design.criterion_map()
+        criteria = self._context.criterion_map()
         all_of = self._extension_string(
             "http://hl7.org/fhir/6.0/StructureDefinition/extension-Group.combinationMethod",
             "all-of",
@@ -1,6 +1,7 @@
 import datetime
 from simple_error_log.error_location import KlassMethodLocation
 from usdm4_fhir.m11.export.export_base import ExportBase
+from usdm4_fhir.factory.base_factory import BaseFactory, trusted_build
 from fhir.resources.bundle import Bundle, BundleEntry
 from fhir.resources.identifier import Identifier
 from fhir.resources.composition import Composition
@@ -16,34 +17,9 @@ class ExportPRISM2(ExportBase):
 
     def to_message(self):
         try:
-            sections = self._process_sections()
-            type_code = CodeableConcept(text="EvidenceReport")
-            date_now = datetime.datetime.now(tz=datetime.timezone.utc)
-            date_str = date_now.isoformat()
-            author = Reference(display="USDM")
-            title = self.study_version.official_title_text()
-            composition = Composition(
-                title=title,
-                type=type_code,
-                section=sections,
-                date=date_str,
-                status="preliminary",
-                author=[author],
-            )
-            identifier = Identifier(
-                system="urn:ietf:rfc:3986", value=f"urn:uuid:{self._uuid}"
-            )
-            bundle_entry = BundleEntry(
-                resource=composition, fullUrl="https://www.example.com/Composition/1234"
-            )
-            bundle = Bundle(
-                id=None,
-                entry=[bundle_entry],
-                type="document",
-                identifier=identifier,
-                timestamp=date_str,
-            )
-            return bundle.json()
+            with trusted_build(self._trusted):
+                bundle = self._bundle()
+            return self._bundle_json(bundle)
         except Exception as e:
             self._errors.exception(
                 "Exception raised generating FHIR PRISM2 M11 message.",
@@ -51,3 +27,36 @@ class ExportPRISM2(ExportBase):
                 KlassMethodLocation(self.MODULE, "to_message"),
             )
             return None
+
+    def _bundle(self) -> Bundle:
+        sections = self._process_sections()
+        type_code = BaseFactory.build(CodeableConcept, text="EvidenceReport")
+        date_now = datetime.datetime.now(tz=datetime.timezone.utc)
+        date_str = date_now.isoformat()
+        author = BaseFactory.build(Reference, display="USDM")
+        title = self.study_version.official_title_text()
+        composition = BaseFactory.build(
+            Composition,
+            title=title,
+            type=type_code,
+            section=sections,
+            date=date_str,
+            status="preliminary",
+            author=[author],
+        )
+        identifier = BaseFactory.build(
+            Identifier, system="urn:ietf:rfc:3986", value=f"urn:uuid:{self._uuid}"
+        )
+        bundle_entry = BaseFactory.build(
+            BundleEntry,
+            resource=composition,
+            fullUrl="https://www.example.com/Composition/1234",
+        )
+        return BaseFactory.build(
+            Bundle,
+            id=None,
+            entry=[bundle_entry],
+            type="document",
+            identifier=identifier,
+            timestamp=date_str,
+        )
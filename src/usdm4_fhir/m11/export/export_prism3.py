@@ -1,4 +1,5 @@
 from uuid import uuid4
+from typing import Iterator, TextIO
 from usdm4_fhir.m11.export.export_base import ExportBase
 from simple_error_log.error_location import KlassMethodLocation
 from usdm4.api.narrative_content import NarrativeContent
@@ -11,6 +12,11 @@ from usdm4_fhir.factory.extension_factory import ExtensionFactory
 from fhir.resources.bundle import Bundle, BundleEntry
 from usdm4_fhir.factory.group_factory import GroupFactory
 from usdm4_fhir.factory.coding_factory import CodingFactory
+from usdm4_fhir.factory.base_factory import (
+    BaseFactory,
+    trusted_build,
+    trusted_iter,
+)
 
 
 class ExportPRISM3(ExportBase):
@@ -22,11 +28,14 @@ class ExportPRISM3(ExportBase):
 
     def to_message(self) -> str | None:
         try:
-            ie = self._create_ie_critieria()
-            compositions = self._create_compositions()
-            rs: ResearchStudyFactoryP3 = self._research_study(compositions, ie)
-            bundle: Bundle = self._bundle(rs, compositions, ie)
-            return bundle.json()
+            with trusted_build(self._trusted):
+                ie = self._create_ie_critieria()
+                compositions = self._create_compositions()
+                rs: ResearchStudyFactoryP3 = self._research_study(
+                    [x.item.id for x in compositions], ie
+                )
+                bundle: Bundle = self._bundle(rs, compositions, ie)
+            return self._bundle_json(bundle)
         except Exception as e:
             self._errors.exception(
                 "Exception raised generating FHIR content.",
@@ -35,84 +44,134 @@ class ExportPRISM3(ExportBase):
             )
             return None
 
+    def to_stream(self, fp: TextIO) -> bool:
+        """Writes the message to a file like object as it is generated. Returns
+        False, with the output incomplete, if an exception was raised"""
+        try:
+            for chunk in trusted_iter(self._chunks(), self._trusted):
+                fp.write(chunk)
+            return True
+        except Exception as e:
+            self._errors.exception(
+                "Exception raised generating FHIR content.",
+                e,
+                KlassMethodLocation(self.MODULE, "to_stream"),
+            )
+            return False
+
+    def iter_chunks(self) -> Iterator[str]:
+        """The message in chunks, joined they are identical to the to_message
+        result. Stops, with the error logged, if an exception was raised"""
+        try:
+            yield from trusted_iter(self._chunks(), self._trusted)
+        except Exception as e:
+            self._errors.exception(
+                "Exception raised generating FHIR content.",
+                e,
+                KlassMethodLocation(self.MODULE, "iter_chunks"),
+            )
+
+    def _chunks(self) -> Iterator[str]:
+        # Each bundle entry is serialized as soon as it is produced and not
+        # kept, only the composition ids are needed for the research study
+        ie = self._create_ie_critieria()
+        composition_ids = []
+
+        def entries():
+            for composition in self._iter_compositions():
+                composition_ids.append(composition.item.id)
+                yield self._composition_entry(composition)
+            rs = self._research_study(composition_ids, ie)
+            yield from self._research_study_entries(rs, ie)
+
+        writer = self._bundle_writer(self._bundle_envelope())
+        yield from writer.iter_chunks(entries())
+
     def _bundle(
         self,
         research_study: ResearchStudyFactoryP3,
         compositions: list[CompositionFactory],
         ie: GroupFactory,
     ):
-        entries = []
+        entries = [self._composition_entry(x) for x in compositions]
+        entries += self._research_study_entries(research_study, ie)
+        return self._bundle_envelope(entries)
 
-        # Compositions
-        composition: CompositionFactory
-        for composition in compositions:
-            entry = BundleEntry(
-                resource=composition.item,
-                request={"method": "PUT", "url": f"Composition/{composition.item.id}"},
-            )
-            entries.append(entry)
+    def _bundle_envelope(self, entries: list[BundleEntry] = None) -> Bundle:
+        return BaseFactory.build(
+            Bundle,
+            id=None,
+            entry=entries,
+            type="transaction",
+            # identifier=identifier,
+            # timestamp=date_str,
+        )
+
+    def _composition_entry(self, composition: CompositionFactory) -> BundleEntry:
+        return BaseFactory.build(
+            BundleEntry,
+            resource=composition.item,
+            request={"method": "PUT", "url": f"Composition/{composition.item.id}"},
+        )
+
+    def _research_study_entries(
+        self, research_study: ResearchStudyFactoryP3, ie: GroupFactory
+    ) -> list[BundleEntry]:
+        entries = []
         for resource in research_study.resources:
             klass = resource.item.__class__.__name__
-            entry = BundleEntry(
+            entry = BaseFactory.build(
+                BundleEntry,
                 resource=resource.item,
                 request={"method": "PUT", "url": f"{klass}/{resource.item.id}"},
             )
             entries.append(entry)
 
         # IE Group
-        entry = BundleEntry(
+        entry = BaseFactory.build(
+            BundleEntry,
             resource=ie.item,
             request={"method": "PUT", "url": f"Group/{ie.item.id}"},
         )
         entries.append(entry)
 
         # RS
-        entry = BundleEntry(
+        entry = BaseFactory.build(
+            BundleEntry,
             resource=research_study.item,
             request={"method": "PUT", "url": f"ResearchStudy/{research_study.item.id}"},
         )
         entries.append(entry)
-
-        # Overall bundle
-        bundle = Bundle(
-            id=None,
-            entry=entries,
-            type="transaction",
-            # identifier=identifier,
-            # timestamp=date_str,
-        )
-        return bundle
+        return entries
 
     def _research_study(
         self,
-        compositions: list[CompositionFactory],
+        composition_ids: list[str],
         ie: GroupFactory,
     ) -> ResearchStudyFactoryP3:
         rs: ResearchStudyFactoryP3 = ResearchStudyFactoryP3(
             self.study, self._errors, self._extra
         )
-        composition: CompositionFactory
-        for composition in compositions:
+        for composition_id in composition_ids:
             ext: ExtensionFactory = ExtensionFactory(
                 errors=self._errors,
                 url="http://hl7.org/fhir/uv/pharmaceutical-research-protocol/StructureDefinition/narrative-elements",
-                valueReference={"reference": f"Composition/{composition.item.id}"},
+                valueReference={"reference": f"Composition/{composition_id}"},
             )
             rs.item.extension.append(ext.item)
         rs.item.recruitment = {"eligibility": {"reference": f"Group/{ie.item.id}"}}
         return rs
 
     def _create_compositions(self):
-        processed_map = {}
-        compositions = []
+        return list(self._iter_compositions())
+
+    def _iter_compositions(self) -> Iterator[CompositionFactory]:
         contents = self.protocol_document_version.narrative_content_in_order()
-        content: NarrativeContent
-        for content in contents:
-            composition = self._content_to_composition_entry(content, processed_map)
+        entries = self._iter_contents("_content_to_composition_entry", contents)
+        for composition in entries:
             if composition:
                 composition.item.id = str(uuid4())
-                compositions.append(composition)
-        return compositions
+                yield composition
 
     def _content_to_composition_entry(
         self, content: NarrativeContent, processed_map: dict
@@ -141,7 +200,7 @@ class ExportPRISM3(ExportBase):
 
     def _create_ie_critieria(self):
         design = self.study_design
-        criteria = design.criterion_map()
+        criteria = self._context.criterion_map()
         all_of: ExtensionFactory = ExtensionFactory(
             errors=self._errors,
             url="http://hl7.org/fhir/6.0/StructureDefinition/extension-Group.description",
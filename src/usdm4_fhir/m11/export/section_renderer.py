@@ -0,0 +1,82 @@
+from concurrent.futures import ProcessPoolExecutor
+from usdm4.api.narrative_content import NarrativeContent
+from simple_error_log.errors import Errors
+from simple_error_log.error import Error
+from simple_error_log.error_location import ErrorLocation
+from usdm4_fhir.factory.base_factory import trusted_build
+
+# Worker process state, set once per worker by _initialise
+_state = {}
+
+
+def render(
+    exporter, method: str, contents: list[NarrativeContent], workers: int
+) -> list:
+    """Calls the exporter method for each content in a process pool. Results
+    are returned, and the errors logged by each call added to the exporter's
+    errors, in content order"""
+    ids = [x.id for x in contents]
+    chunksize = max(1, len(ids) // (workers * 4))
+    initargs = (
+        type(exporter),
+        exporter.study,
+        exporter._extra,
+        exporter._context,
+        exporter._now,
+        exporter._trusted,
+    )
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_initialise, initargs=initargs
+    ) as executor:
+        results = list(
+            executor.map(_render, [method] * len(ids), ids, chunksize=chunksize)
+        )
+    output = []
+    for result, errors in results:
+        # Errors.merge re-sorts by timestamp, keep the sequential order instead
+        errors.replay(exporter.errors)
+        output.append(result)
+    return output
+
+
+class RecordedErrors(Errors):
+    """An error log that also records each entry so that it can be replayed,
+    in order, into another log"""
+
+    def __init__(self):
+        super().__init__()
+        self.entries = []
+
+    def add(
+        self,
+        message: str,
+        location: ErrorLocation = None,
+        error_type: str = "",
+        level: int = Error.ERROR,
+        extra: dict | None = None,
+    ) -> None:
+        super().add(message, location, error_type, level, extra)
+        self.entries.append((message, location, error_type, level, extra))
+
+    def replay(self, errors: Errors) -> None:
+        for message, location, error_type, level, extra in self.entries:
+            errors.add(message, location, error_type, level, extra)
+
+
+def _initialise(klass, study, extra, context, now, trusted):
+    # One exporter per worker, reused for every content it renders
+    exporter = klass(study, extra, context, trusted=trusted)
+    exporter._now = now
+    _state["exporter"] = exporter
+
+
+def _render(method: str, id: str):
+    # Each call logs to a new log so the errors returned are those of the call
+    exporter = _state["exporter"]
+    errors = RecordedErrors()
+    exporter._log_to(errors)
+    content = exporter._nc_map[id]
+    # The trusted setting is not inherited by the worker process
+    with trusted_build(exporter._trusted):
+        result = getattr(exporter, method)(content, {})
+    return result, errors
@@ -0,0 +1,78 @@
+import asyncio
+from typing import AsyncIterator, Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from usdm4.api.wrapper import Wrapper
+from usdm4_fhir.utility.bundle_reader import BundleSource
+from simple_error_log.errors import Errors
+from simple_error_log.error_location import KlassMethodLocation
+
+MODULE = "usdm4_fhir.m11.import_.batch_import"
+
+
+class ImportResult:
+    """The outcome of importing one message, index is the message's position
+    in the paths"""
+
+    def __init__(
+        self, index: int, path: BundleSource, wrapper: Wrapper | None, errors: Errors
+    ):
+        self.index = index
+        self.path = path
+        self.wrapper = wrapper
+        self.errors = errors
+
+    @property
+    def failed(self) -> bool:
+        return self.wrapper is None
+
+
+async def import_messages(
+    klass,
+    paths: Iterable[BundleSource],
+    concurrency: int = 4,
+    executor: Executor = None,
+) -> AsyncIterator[ImportResult]:
+    """Imports each message with a new importer of the class, at most
+    concurrency at a time, yielding the results as they complete. The
+    blocking work of each import runs in the executor (the loop's default
+    thread pool if None)"""
+    paths = enumerate(paths)
+    pending = set()
+    try:
+        while True:
+            for index, path in paths:
+                pending.add(asyncio.create_task(_import(klass, index, path, executor)))
+                if len(pending) >= concurrency:
+                    break
+            if not pending:
+                return
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _import(
+    klass, index: int, path: BundleSource, executor: Executor
+) -> ImportResult:
+    try:
+        # Creating an importer loads the USDM library, blocking as well. It
+        # is needed here, so not created in a process pool
+        loop = asyncio.get_running_loop()
+        importer = await loop.run_in_executor(
+            None if isinstance(executor, ProcessPoolExecutor) else executor, klass
+        )
+        wrapper = await importer.from_message(path, executor)
+        return ImportResult(index, path, wrapper, importer.errors)
+    except Exception as e:
+        errors = Errors()
+        errors.exception(
+            "Exception raised importing message",
+            e,
+            KlassMethodLocation(MODULE, "_import"),
+        )
+        return ImportResult(index, path, None, errors)
@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
 from uuid import uuid4
 from simple_error_log.errors import Errors
 from simple_error_log.error_location import KlassMethodLocation
@@ -22,6 +24,7 @@ from usdm4 import USDM4
 from usdm4.__info__ import (
     __model_version__ as usdm_version,
 )
+from usdm4_fhir.utility.bundle_reader import BundleSource, read_json, to_bundle
 from usdm4_fhir.__info__ import (
     __system_name__ as SYSTEM_NAME,
     __package_version__ as VERSION,
@@ -43,18 +46,31 @@ class ImportPRISM2:
         self._builder: Builder = self._usdm4.builder(self._errors)
         self._encoder = Encoder(self._builder, self._errors)
         self._ncs = []
-        self._title_page = None
+        self._title_page: TitlePage = None
         self._index = 1
 
     @property
     def errors(self) -> Errors:
         return self._errors
 
-    async def from_message(self, filepath: str) -> Wrapper | None:
+    async def from_message(
+        self, filepath: BundleSource, executor: Executor = None
+    ) -> Wrapper | None:
+        # The blocking read, parse and study build run in the executor (the
+        # loop's default if None), the address lookups are awaited on the
+        # loop. All share the importer's builder, so an executor working on
+        # copies of the importer, a process pool, can't be used
         try:
             self._errors.info("Importing FHIR PRISM2")
-            data = self._read_file(filepath)
-            study = await self._from_fhir(data)
+            if isinstance(executor, ProcessPoolExecutor):
+                self._errors.error(
+                    "PRISM2 import can't be run in a process pool executor",
+                    KlassMethodLocation(self.MODULE, "from_message"),
+                )
+                return None
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(executor, self._read_file, filepath)
+            study = await self._from_fhir(data, executor)
             return Wrapper(
                 study=study,
                 usdmVersion=usdm_version,
@@ -87,11 +103,25 @@ class ImportPRISM2:
             },
         }
 
-    async def _from_fhir(self, data: str) -> Wrapper:
-        bundle = Bundle.parse_raw(data)
+    async def _from_fhir(
+        self, data: dict | Bundle, executor: Executor = None
+    ) -> Wrapper:
+        loop = asyncio.get_running_loop()
+        protocol_document, ncis = await loop.run_in_executor(
+            executor, self._parse, data
+        )
+        await self._title_page.process()
+        return await loop.run_in_executor(
+            executor, self._study, protocol_document, ncis
+        )
+
+    def _parse(self, data: dict | Bundle) -> tuple[StudyDefinitionDocument, list]:
+        bundle = to_bundle(data)
         protocol_document, ncis = self._document(bundle)
-        study = await self._study(protocol_document, ncis)
-        return study
+        sections = protocol_document.versions[0].contents
+        self._title_page = TitlePage(sections, ncis, self._errors)
+        self._title_page.read()
+        return protocol_document, ncis
 
     def _document(self, bundle):
         self._ncs = []
@@ -173,11 +203,8 @@ class ImportPRISM2:
         parts: list[str] = text.split("-")
         return parts[0].replace("section", "") if len(parts) >= 2 else ""
 
-    async def _study(self, protocol_document: StudyDefinitionDocument, ncis: list):
+    def _study(self, protocol_document: StudyDefinitionDocument, ncis: list):
         protocol_document_version = protocol_document.versions[0]
-        sections = protocol_document_version.contents
-        self._title_page: TitlePage = TitlePage(sections, ncis, self._errors)
-        await self._title_page.process()
 
         # Dates
         sponsor_approval_date_code = self._builder.cdisc_code("C71476", "Approval Date")
@@ -323,12 +350,9 @@ class ImportPRISM2:
         )
         return study
 
-    def _read_file(self, full_path: str) -> dict:
+    def _read_file(self, source: BundleSource) -> dict | Bundle:
         try:
-            with open(full_path, "r") as f:
-                data = f.read()
-                f.close()
-                return data
+            return read_json(source)
         except Exception as e:
             self._errors.exception(
                 "Failed to read FHIR message file",
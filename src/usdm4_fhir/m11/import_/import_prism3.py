@@ -1,8 +1,11 @@
+import asyncio
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor
 from simple_error_log.errors import Errors
 from simple_error_log.error_location import KlassMethodLocation
 from usdm4.api.wrapper import Wrapper
 from fhir.resources.resource import Resource
-from fhir.resources.bundle import Bundle, BundleEntry
+from fhir.resources.bundle import Bundle
 from fhir.resources.codeableconcept import CodeableConcept
 from fhir.resources.coding import Coding
 from fhir.resources.researchstudy import (
@@ -19,6 +22,8 @@ from fhir.resources.composition import Composition, CompositionSection
 from fhir.resources.extendedcontactdetail import ExtendedContactDetail
 from fhir.resources.group import Group
 from usdm4 import USDM4
+from usdm4_fhir.utility.bundle_index import BundleIndex
+from usdm4_fhir.utility.bundle_reader import BundleSource, read_json, to_bundle
 from usdm4_fhir.__info__ import (
     __system_name__ as SYSTEM_NAME,
     __package_version__ as VERSION,
@@ -45,12 +50,30 @@ class ImportPRISM3:
         self._usdm4: USDM4 = USDM4()
         self._assembler = self._usdm4.assembler(self._errors)
         self._source_data = {}
+        self._index: BundleIndex = None
+        self._extension_maps: dict[int, tuple[list, dict]] = {}
 
     @property
     def errors(self) -> Errors:
         return self._errors
 
-    async def from_message(self, filepath: str) -> Wrapper | None:
+    async def from_message(
+        self, filepath: BundleSource, executor: Executor = None
+    ) -> Wrapper | None:
+        # The read, parse and assembly are all blocking so run, together, in
+        # the executor (the loop's default if None) leaving the loop free. A
+        # process pool can't log to this importer's errors, the import there
+        # is by a new importer whose errors are returned and merged
+        loop = asyncio.get_running_loop()
+        if isinstance(executor, ProcessPoolExecutor):
+            wrapper, errors = await loop.run_in_executor(
+                executor, _import, type(self), filepath
+            )
+            self._errors.merge(errors)
+            return wrapper
+        return await loop.run_in_executor(executor, self._from_message, filepath)
+
+    def _from_message(self, filepath: BundleSource) -> Wrapper | None:
         try:
             self._errors.info("Importing FHIR PRISM3")
             data = self._read_file(filepath)
@@ -65,10 +88,11 @@ class ImportPRISM3:
             )
             return None
 
-    def _from_fhir(self, data: str) -> Wrapper:
+    def _from_fhir(self, data: dict | Bundle) -> Wrapper:
         try:
             study = None
-            bundle = Bundle.parse_raw(data)
+            self._extension_maps = {}
+            bundle = to_bundle(data)
             research_study: ResearchStudy = self._extract_from_bundle_type(
                 bundle, ResearchStudy.__name__, first=True
             )
@@ -92,16 +116,13 @@ class ImportPRISM3:
         self, bundle: Bundle, resource_type: str, first=False
     ) -> list:
         try:
-            results = []
-            entry: BundleEntry
-            for entry in bundle.entry:
-                resource: Resource = entry.resource
-                if resource.resource_type == resource_type:
-                    return resource if first else results.append(resource)
+            results = self._bundle_index(bundle).of_type(resource_type)
+            if results:
+                return results[0] if first else list(results)
             self._errors.warning(
-                "Unable to extract '{resource_type}' by type from the bundle"
+                f"Unable to extract '{resource_type}' by type from the bundle"
             )
-            return None if first else results
+            return None if first else []
         except Exception as e:
             self._errors.exception(
                 "Exception raised extracting from Bundle",
@@ -114,13 +135,9 @@ class ImportPRISM3:
         self, bundle: Bundle, resource_type: str, id: str
     ) -> list:
         try:
-            entry: BundleEntry
-            for entry in bundle.entry:
-                resource: Resource = entry.resource
-                if (resource.resource_type == resource_type) and (
-                    f"{resource_type}/{resource.id}" == id
-                ):
-                    return resource
+            resource: Resource = self._bundle_index(bundle).get(resource_type, id)
+            if resource is not None:
+                return resource
             self._errors.warning(
                 f"Unable to extract '{resource_type}/{id}' by id from the bundle"
             )
@@ -133,6 +150,12 @@ class ImportPRISM3:
             )
             return None
 
+    def _bundle_index(self, bundle: Bundle) -> BundleIndex:
+        # Built once per bundle, on first use, all extractors then share it
+        if self._index is None or self._index.bundle is not bundle:
+            self._index = BundleIndex(bundle)
+        return self._index
+
     def _study(self, research_study: ResearchStudy, bundle: Bundle) -> dict:
         try:
             acronym = self._extract_acronym(research_study.label)
@@ -703,15 +726,13 @@ class ImportPRISM3:
         return parts[0].replace("section", "") if len(parts) >= 2 else ""
 
     def _extract_narrative_references(self, extensions: list) -> list:
-        results = []
-        item: Extension
-        for item in extensions:
-            if (
-                item.url
-                == "http://hl7.org/fhir/uv/pharmaceutical-research-protocol/StructureDefinition/narrative-elements"
-            ):
-                results.append(item.valueReference.reference)
-        return results
+        return [
+            item.valueReference.reference
+            for item in self._extract_extensions(
+                extensions,
+                "http://hl7.org/fhir/uv/pharmaceutical-research-protocol/StructureDefinition/narrative-elements",
+            )
+        ]
 
     def _extract_confidentiality_statement(self, extensions: list) -> str:
         ext = self._extract_extension(
@@ -731,29 +752,42 @@ class ImportPRISM3:
         return ext.valueCoding.display if ext else "NO"
 
     def _extract_extension(self, extensions: list, url: str) -> Extension:
-        item: Extension
-        for item in extensions:
-            if item.url == url:
-                return item
-        return None
+        items = self._extension_map(extensions).get(url)
+        return items[0] if items else None
 
     def _extract_extensions(self, extensions: list, url: str) -> list[Extension]:
-        results = []
-        item: Extension
-        for item in extensions:
-            if item.url == url:
-                results.append(item)
-        return results
-
-    def _read_file(self, full_path: str) -> dict:
+        return list(self._extension_map(extensions).get(url, []))
+
+    def _extension_map(self, extensions: list) -> dict[str, list[Extension]]:
+        # The extensions grouped by url, in order, built in one pass the first
+        # time a list is searched. The list is kept with its map so a reused
+        # id can't return another list's map
+        if not extensions:
+            return {}
+        cached = self._extension_maps.get(id(extensions))
+        if cached is None or cached[0] is not extensions:
+            result = defaultdict(list)
+            item: Extension
+            for item in extensions:
+                result[item.url].append(item)
+            cached = (extensions, result)
+            self._extension_maps[id(extensions)] = cached
+        return cached[1]
+
+    def _read_file(self, source: BundleSource) -> dict | Bundle:
         try:
-            with open(full_path, "r") as f:
-                data = f.read()
-                f.close()
-                return data
+            return read_json(source)
         except Exception as e:
             self._errors.exception(
                 "Failed to read FHIR message file",
                 e,
                 KlassMethodLocation(self.MODULE, "_read_file"),
             )
+
+
+def _import(
+    klass: type[ImportPRISM3], filepath: BundleSource
+) -> tuple[Wrapper | None, Errors]:
+    # Run in a worker process, module level so it can be pickled
+    importer = klass()
+    return importer._from_message(filepath), importer.errors
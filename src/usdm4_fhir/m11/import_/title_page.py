@@ -1,14 +1,36 @@
 import re
-import warnings
 from simple_error_log.errors import Errors
 from simple_error_log.error_location import KlassMethodLocation
 import dateutil.parser as parser
-from bs4 import BeautifulSoup
+from usdm4_fhir.m11.utility.soup import parse_with_warnings
 from usdm4_fhir.m11.utility.address_service import AddressService
 
 
 class TitlePage:
     MODULE = "usdm4_fhir.m11.import_.title_page.TitlePage"
+    ROW_KEYS = [
+        "Sponsor Confidentiality",
+        "Full Title",
+        "Acronym",
+        "Sponsor Protocol Identifier",
+        "Original Protocol",
+        "Version Number",
+        "Version Date",
+        "Amendment Identifier",
+        "Amendment Scope",
+        "Amendment Details",
+        "Trial Phase",
+        "Compound Code",
+        "Compound Name",
+        "Short Title",
+        "Sponsor Name and Address",
+        "Regulatory Agency Identifier Number(s)",
+        "Sponsor Approval",
+        "Manufacturer",
+        "Sponsor Signatory",
+        "Medical Expert",
+        "SAE Reporting",
+    ]
 
     def __init__(self, sections: list, items: list, errors: Errors):
         self._sections = sections
@@ -40,40 +62,50 @@ class TitlePage:
         self.medical_expert_contact = None
         self.sae_reporting_method = None
         self.study_name = None
+        self._rows = None
+        self._read = False
+
+    def read(self):
+        # The blocking part, the soup parsing of the title page table, apart
+        # so it can be run in an executor before process
+        self._rows = self._title_table(self._sections, self._items)
+        self._read = True
 
     async def process(self):
-        table = self._title_table(self._sections, self._items)
+        if not self._read:
+            self.read()
+        rows = self._rows
         self.sponosr_confidentiality = self._table_get_row(
-            table, "Sponsor Confidentiality"
+            rows, "Sponsor Confidentiality"
         )
-        self.full_title = self._table_get_row(table, "Full Title")
-        self.acronym = self._table_get_row(table, "Acronym")
+        self.full_title = self._table_get_row(rows, "Full Title")
+        self.acronym = self._table_get_row(rows, "Acronym")
         self.sponsor_protocol_identifier = self._table_get_row(
-            table, "Sponsor Protocol Identifier"
+            rows, "Sponsor Protocol Identifier"
         )
-        self.original_protocol = self._table_get_row(table, "Original Protocol")
-        self.version_number = self._table_get_row(table, "Version Number")
-        self.version_date = self._get_protocol_date(table)
-        self.amendment_identifier = self._table_get_row(table, "Amendment Identifier")
-        self.amendment_scope = self._table_get_row(table, "Amendment Scope")
-        self.amendment_details = self._table_get_row(table, "Amendment Details")
-        self.trial_phase_raw = self._table_get_row(table, "Trial Phase")
-        self.compound_codes = self._table_get_row(table, "Compound Code")
-        self.compound_names = self._table_get_row(table, "Compound Name")
-        self.trial_phase = self._table_get_row(table, "Trial Phase")
-        self.short_title = self._table_get_row(table, "Short Title")
+        self.original_protocol = self._table_get_row(rows, "Original Protocol")
+        self.version_number = self._table_get_row(rows, "Version Number")
+        self.version_date = self._get_protocol_date(rows)
+        self.amendment_identifier = self._table_get_row(rows, "Amendment Identifier")
+        self.amendment_scope = self._table_get_row(rows, "Amendment Scope")
+        self.amendment_details = self._table_get_row(rows, "Amendment Details")
+        self.trial_phase_raw = self._table_get_row(rows, "Trial Phase")
+        self.compound_codes = self._table_get_row(rows, "Compound Code")
+        self.compound_names = self._table_get_row(rows, "Compound Name")
+        self.trial_phase = self._table_get_row(rows, "Trial Phase")
+        self.short_title = self._table_get_row(rows, "Short Title")
         self.sponsor_name_and_address = self._table_get_row(
-            table, "Sponsor Name and Address"
+            rows, "Sponsor Name and Address"
         )
         self.sponsor_name, self.sponsor_address = await self._sponsor_name_and_address()
         self.regulatory_agency_identifiers = self._table_get_row(
-            table, "Regulatory Agency Identifier Number(s)"
+            rows, "Regulatory Agency Identifier Number(s)"
         )
-        self.sponsor_approval_date = self._get_sponsor_approval_date(table)
-        self.manufacturer_name_and_address = self._table_get_row(table, "Manufacturer")
-        self.sponsor_signatory = self._table_get_row(table, "Sponsor Signatory")
-        self.medical_expert_contact = self._table_get_row(table, "Medical Expert")
-        self.sae_reporting_method = self._table_get_row(table, "SAE Reporting")
+        self.sponsor_approval_date = self._get_sponsor_approval_date(rows)
+        self.manufacturer_name_and_address = self._table_get_row(rows, "Manufacturer")
+        self.sponsor_signatory = self._table_get_row(rows, "Sponsor Signatory")
+        self.medical_expert_contact = self._table_get_row(rows, "Medical Expert")
+        self.sae_reporting_method = self._table_get_row(rows, "SAE Reporting")
         self.study_name = self._study_name()
 
     def extra(self):
@@ -94,35 +126,62 @@ class TitlePage:
             "sponsor_approval_date": self.sponsor_approval_date,
         }
 
-    def _title_table(self, sections, items):
+    def _title_table(self, sections, items) -> dict[str, str] | None:
+        # Reversed so the first item wins where ids repeat, as a scan would
+        item_map = {x.id: x for x in reversed(items)}
         for section in sections:
-            item = next((x for x in items if x.id == section.contentItemId), None)
-            if item:
+            item = item_map.get(section.contentItemId)
+            if item and self._may_be_title_page(str(item.text)):
                 soup = self._get_soup(str(item.text))
                 for table in soup(["table"]):
-                    title = self._table_get_row(table, "Full Title")
+                    rows = self._table_rows(table)
+                    title = self._table_get_row(rows, "Full Title")
                     if title:
                         self._errors.debug(
                             "Found M11 title page table",
                             KlassMethodLocation(self.MODULE, "_title_table"),
                         )
-                        return table
+                        return rows
         self._errors.warning(
             "Cannot locate M11 title page table!",
             KlassMethodLocation(self.MODULE, "_title_table"),
         )
         return None
 
-    def _table_get_row(self, table, key: str) -> str:
-        if table:
-            soup = self._get_soup(str(table))
-            for row in soup(["tr"]):
-                cells = row.findAll("td")
-                if key.upper() in str(cells[0].get_text()).upper():
-                    r1 = [x.get_text() for x in cells[1](["p"])]
-                    r2 = ("\n").join(r1)
-                    self._errors.info(f"Decoded M11 FHIR message {key} = {r2}")
-                    return r2
+    def _may_be_title_page(self, text: str) -> bool:
+        # A cheap check on the text before building a soup, the title page
+        # has a table with a 'Full Title' row. The words are checked apart
+        # as markup may fall between them
+        lower = text.lower()
+        return "<table" in lower and "full" in lower and "title" in lower
+
+    def _table_rows(self, table) -> dict[str, str]:
+        # The table parsed once into the value of each of the ROW_KEYS, the
+        # first row whose label contains the key (ignoring case)
+        result = {}
+        keys = [(x, x.upper()) for x in self.ROW_KEYS]
+        for row in table(["tr"]):
+            cells = row.findAll("td")
+            if not cells:
+                continue
+            label = str(cells[0].get_text()).upper()
+            value = None
+            for key, upper_key in keys:
+                if key not in result and upper_key in label:
+                    if value is None:
+                        value = (
+                            ("\n").join([x.get_text() for x in cells[1](["p"])])
+                            if len(cells) > 1
+                            else ""
+                        )
+                    result[key] = value
+        return result
+
+    def _table_get_row(self, rows: dict[str, str] | None, key: str) -> str:
+        if rows and key in rows:
+            value = rows[key]
+            self._errors.info(f"Decoded M11 FHIR message {key} = {value}")
+            return value
         self._errors.info(
             f"Failed to decode M11 FHIR message {key}",
             KlassMethodLocation(self.MODULE, "_table_get_row"),
@@ -132,14 +191,12 @@ class TitlePage:
     def _get_soup(self, text):
         soup = None
         try:
-            with warnings.catch_warnings(record=True) as warning_list:
-                soup = BeautifulSoup(text, "html.parser")
-            if warning_list:
-                for item in warning_list:
-                    self._errors.debug(
-                        f"Warning raised within Soup package, processing '{text}'\nMessage returned '{item.message}'",
-                        KlassMethodLocation(self.MODULE, "_get_soup"),
-                    )
+            soup, messages = parse_with_warnings(text)
+            for message in messages:
+                self._errors.debug(
+                    f"Warning raised within Soup package, processing '{text}'\nMessage returned '{message}'",
+                    KlassMethodLocation(self.MODULE, "_get_soup"),
+                )
         except Exception as e:
             self._errors.exception(
                 f"Error raised while Beautiful Soup parsing '{text}'",
@@ -207,15 +264,15 @@ class TitlePage:
         )
         return name, params
 
-    def _get_sponsor_approval_date(self, table):
-        return self._get_date(table, "Sponsor Approval")
+    def _get_sponsor_approval_date(self, rows):
+        return self._get_date(rows, "Sponsor Approval")
 
-    def _get_protocol_date(self, table):
-        return self._get_date(table, "Version Date")
+    def _get_protocol_date(self, rows):
+        return self._get_date(rows, "Version Date")
 
-    def _get_date(self, table, text):
+    def _get_date(self, rows, text):
         try:
-            date_text = self._table_get_row(table, text)
+            date_text = self._table_get_row(rows, text)
             if date_text:
                 date = parser.parse(date_text)
                 return date
@@ -1,23 +1,107 @@
+import re
 import warnings
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
+from bs4.builder import ParserRejectedMarkup, XMLParsedAsHTMLWarning
+from bs4.builder._htmlparser import BeautifulSoupHTMLParser, HTMLParserTreeBuilder
 from simple_error_log.errors import Errors
 from simple_error_log.error_location import KlassMethodLocation
 
+# Narrative is parsed with html.parser only. No faster, C-backed, parser
+# gave the same output, lxml repairs malformed markup and decodes entities
+# differently
+PARSER = "html.parser"
+# The rules and messages of the warning Soup raises for text that looks like
+# a URL or a file name, those of beautifulsoup4 4.12.3 (the version pinned).
+# Soup checks text this long or shorter, without markup. See locator_warning
+LOCATOR_LENGTH = 256
+URL_PREFIXES = ("http:", "https:")
+FILE_EXTENSIONS = (".html", ".htm", ".xml", ".xhtml", ".txt")
+URL_MESSAGE = (
+    "The input looks more like a URL than markup. You may want to use an HTTP"
+    " client like requests to get the document behind the URL, and feed that"
+    " document to Beautiful Soup."
+)
+FILENAME_MESSAGE = (
+    "The input looks more like a filename than markup. You may want to open"
+    " this file and pass the filehandle into Beautiful Soup."
+)
+
+# The Soup warnings are detected rather than caught, as catching them swaps
+# the interpreter's global warning state on every parse. Those for text that
+# looks like a locator are raised against the caller, this module, and
+# ignored. Those for XML parsed as HTML are recorded by the parser, see
+# _TreeBuilder
+warnings.filterwarnings(
+    "ignore", category=MarkupResemblesLocatorWarning, module=re.escape(__name__)
+)
+
+
+class _HTMLParser(BeautifulSoupHTMLParser):
+    def _warn(self, stacklevel=5):
+        # Soup's check for XML parsed as HTML, recorded rather than raised
+        self.soup.builder.warnings.append(XMLParsedAsHTMLWarning.MESSAGE)
+
+
+class _TreeBuilder(HTMLParserTreeBuilder):
+    """html.parser, with the messages of the warnings for XML parsed as HTML
+    kept in warnings. Used for a single parse"""
+
+    def __init__(self):
+        super().__init__()
+        self.warnings = []
+
+    def feed(self, markup):
+        # As HTMLParserTreeBuilder.feed, through _HTMLParser
+        args, kwargs = self.parser_args
+        parser = _HTMLParser(*args, **kwargs)
+        parser.soup = self.soup
+        try:
+            parser.feed(markup)
+            parser.close()
+        except AssertionError as e:
+            raise ParserRejectedMarkup(e)
+        parser.already_closed_empty_element = []
+
+
+def parse(text: str) -> BeautifulSoup:
+    return BeautifulSoup(text, builder=_TreeBuilder())
+
+
+def parse_with_warnings(text: str) -> tuple[BeautifulSoup, list[str]]:
+    """Parses the text, returning the soup and the messages of the warnings
+    Soup would raise: text that looks like a URL or file name or XML"""
+    builder = _TreeBuilder()
+    soup = BeautifulSoup(text, builder=builder)
+    if isinstance(text, bytes):
+        text = text.decode("utf-8", "replace")
+    message = locator_warning(text)
+    return soup, ([message] if message else []) + builder.warnings
+
+
+def locator_warning(text: str) -> str | None:
+    """The message of the warning Soup raises for short text, without markup,
+    that looks like a URL or a file name, None if there is none"""
+    if len(text) > LOCATOR_LENGTH or "<" in text:
+        return None
+    if text.startswith(URL_PREFIXES) and " " not in text:
+        return URL_MESSAGE
+    if "/" in text or "\\" in text or text.lower().endswith(FILE_EXTENSIONS):
+        return FILENAME_MESSAGE
+    return None
+
 
 def get_soup(text: str, errors: Errors) -> BeautifulSoup:
     MODULE = "usdm4_fhir.m11.soup.soup"
     try:
-        with warnings.catch_warnings(record=True) as warning_list:
-            result = BeautifulSoup(text, "html.parser")
-        if warning_list:
-            for item in warning_list:
-                errors.debug(
-                    f"Warning raised within Soup package, processing '{text}'\nMessage returned '{item.message}'",
-                    KlassMethodLocation(MODULE, "get_soup"),
-                )
+        result, messages = parse_with_warnings(text)
+        for message in messages:
+            errors.debug(
+                f"Warning raised within Soup package, processing '{text}'\nMessage returned '{message}'",
+                KlassMethodLocation(MODULE, "get_soup"),
+            )
         return result
     except Exception as e:
         errors.exception(
             f"Parsing '{text}' with soup", e, KlassMethodLocation(MODULE, "get_soup")
         )
-        return BeautifulSoup("", "html.parser")
+        return BeautifulSoup("", PARSER)
@@ -1,25 +1,64 @@
-from bs4 import BeautifulSoup
+import re
+import copy
+from bs4 import BeautifulSoup, NavigableString
 from usdm4_fhir.utility.data_store import DataStore
 from simple_error_log.errors import Errors
 from simple_error_log.error_location import KlassMethodLocation
 from usdm4.api.syntax_template_dictionary import SyntaxTemplateDictionary, ParameterMap
-from usdm4_fhir.m11.utility.soup import get_soup
+from usdm4_fhir.m11.utility.soup import get_soup, locator_warning
+from usdm4_fhir.utility.lru_cache import LRUCache
 
 
 class TagReference:
     MODULE = "usdm4_fhir.m11.reference_resolver.ReferenceResolver"
+    CACHE_SIZE = 1024
+    # html.parser lower cases tag names, so match as the parser would
+    TAG_PATTERN = re.compile(r"<usdm:(?:ref|tag)\b", re.IGNORECASE)
+    # Text the parser would change or warn about when it contains no markup
+    MARKUP_PATTERN = re.compile(r"[<>&]")
 
-    def __init__(self, data_store: DataStore, errors: Errors):
+    def __init__(
+        self, data_store: DataStore, errors: Errors, cache_size: int = CACHE_SIZE
+    ):
         self._data_store = data_store
         self._errors = errors
+        # Fully expanded fragments keyed by ("ref", klass, id, attribute) or
+        # ("tag", dictionaryId, tag), see _cacheable
+        self.cache = LRUCache(cache_size)
+        # Per dictionary tag -> reference map (None if no dictionary)
+        self._parameter_maps: dict[str, dict[str, str] | None] = {}
 
     def translate(self, instance: object, text: str) -> str:
         if text:
+            if not self.has_tags(text):
+                return self.normalise(text)
             soup = get_soup(text, self._errors)
-            return str(self._translate_references(instance, soup))
+            return str(self.translate_soup(instance, soup))
         else:
             return ""
 
+    def translate_soup(self, instance: object, soup: BeautifulSoup) -> BeautifulSoup:
+        """Expands the usdm:ref and usdm:tag elements of a parsed text in place"""
+        return self._translate_references(instance, soup)
+
+    @classmethod
+    def has_tags(cls, text: str) -> bool:
+        return cls.TAG_PATTERN.search(text) is not None
+
+    def normalise(self, text: str) -> str:
+        # Plain text is returned untouched as the parser would. Markup, white
+        # space only text and text the parser warns about (a short string
+        # that looks like a URL or file name) are still parsed so the output
+        # and the logged warnings are unchanged
+        if self._is_plain(text):
+            return text
+        return str(get_soup(text, self._errors))
+
+    def _is_plain(self, text: str) -> bool:
+        if self.MARKUP_PATTERN.search(text) or not text.strip():
+            return False
+        return locator_warning(text) is None
+
     def _translate_references(
         self, instance: object, soup: BeautifulSoup
     ) -> BeautifulSoup:
@@ -27,11 +66,23 @@ class TagReference:
         for ref in soup(["usdm:ref", "usdm:tag"]):
             try:
                 if ref.name == "usdm:ref":
-                    instance, text = self._resolve_usdm_ref(instance, ref)
-                    ref.replace_with(self._translate_references(instance, text))
+                    attributes = ref.attrs
+                    key = (
+                        "ref",
+                        attributes["klass"],
+                        attributes["id"],
+                        attributes["attribute"],
+                    )
+                    instance, text = self._expand(
+                        key, instance, ref, self._resolve_usdm_ref
+                    )
+                    ref.replace_with(text)
                 if ref.name == "usdm:tag":
-                    instance, text = self._resolve_usdm_tag(instance, ref)
-                    ref.replace_with(self._translate_references(instance, text))
+                    key = ("tag", instance.dictionaryId, ref.attrs["name"])
+                    instance, text = self._expand(
+                        key, instance, ref, self._resolve_usdm_tag
+                    )
+                    ref.replace_with(text)
             except Exception as e:
                 print(f"TEXT: {text}, {instance.model_dump()}")
                 self._errors.exception(
@@ -41,6 +92,38 @@ class TagReference:
                 )
         return soup
 
+    def _expand(
+        self, key: tuple, instance: object, ref: BeautifulSoup, resolver
+    ) -> tuple[object, BeautifulSoup | NavigableString]:
+        cached = self.cache.get(key)
+        if cached is not None:
+            if key[0] == "ref":
+                instance = self._data_store.get(key[1], key[2])
+            return instance, self._from_cache(cached)
+        # Only expansions that logged nothing are cached, so that repeated
+        # failures are still reported for every occurrence
+        count = self._errors.count()
+        instance, text = resolver(instance, ref)
+        text = self._translate_references(instance, text)
+        if self._errors.count() == count:
+            self.cache.put(key, self._cacheable(text))
+        return instance, text
+
+    @staticmethod
+    def _cacheable(soup: BeautifulSoup) -> str | BeautifulSoup:
+        # An expansion that is only text, most are, is kept as the text and
+        # inserted without a parse. Others are kept parsed and copied on use
+        # as the insertion moves the nodes into the caller's tree
+        if all(type(x) is NavigableString for x in soup.contents):
+            return "".join(soup.contents)
+        return copy.copy(soup)
+
+    @staticmethod
+    def _from_cache(cached: str | BeautifulSoup) -> BeautifulSoup | NavigableString:
+        if isinstance(cached, str):
+            return NavigableString(cached)
+        return copy.copy(cached)
+
     def _resolve_usdm_ref(
         self, instance: object, ref: BeautifulSoup
     ) -> tuple[object, BeautifulSoup]:
@@ -53,17 +136,14 @@ class TagReference:
         self, instance: object, ref: BeautifulSoup
     ) -> tuple[object, BeautifulSoup]:
         attributes = ref.attrs
-        dictionary: SyntaxTemplateDictionary = self._data_store.get(
-            "SyntaxTemplateDictionary", instance.dictionaryId
-        )
-        if dictionary:
-            p_map: ParameterMap
-            for p_map in dictionary.parameterMaps:
-                if p_map.tag == attributes["name"]:
-                    return instance, get_soup(p_map.reference, self._errors)
+        parameter_map = self._parameter_map(instance.dictionaryId)
+        if parameter_map is not None:
+            if attributes["name"] in parameter_map:
+                reference = parameter_map[attributes["name"]]
+                return instance, get_soup(reference, self._errors)
         error_text = (
             f"tag '{attributes['name']}' not found"
-            if dictionary
+            if parameter_map is not None
             else "no dictionary found"
         )
         self._errors.error(
@@ -71,3 +151,18 @@ class TagReference:
             KlassMethodLocation(self.MODULE, "_resolve_usdm_tag"),
         )
         return instance, get_soup(f"<i>{error_text}</i>", self._errors)
+
+    def _parameter_map(self, dictionary_id: str) -> dict[str, str] | None:
+        if dictionary_id not in self._parameter_maps:
+            dictionary: SyntaxTemplateDictionary = self._data_store.get(
+                "SyntaxTemplateDictionary", dictionary_id
+            )
+            parameter_map = None
+            if dictionary:
+                parameter_map = {}
+                p_map: ParameterMap
+                for p_map in dictionary.parameterMaps:
+                    # First map for a tag wins, as for a linear search
+                    parameter_map.setdefault(p_map.tag, p_map.reference)
+            self._parameter_maps[dictionary_id] = parameter_map
+        return self._parameter_maps[dictionary_id]
@@ -1,4 +1,6 @@
 import datetime
+from typing import Iterator, TextIO
+from fhir.resources.bundle import BundleEntry
 from usdm4.api.study import Study
 from usdm4.api.study_version import StudyVersion
 from usdm4.api.study_design import StudyDesign
@@ -11,11 +13,19 @@ from usdm4_fhir.factory.timeline_plan_definition_factory import (
     TimelinePlanDefinitionFactory,
 )
 from usdm4_fhir.factory.timepoint_plan_definition_factory import (
+    ActivityIndex,
     TimepointPlanDefinitionFactory,
 )
 from usdm4_fhir.factory.activity_definition_factory import ActivityDefinitionFactory
 from usdm4_fhir.factory.urn_uuid import URNUUID
-from usdm4_fhir.factory.study_url import StudyUrl
+from usdm4_fhir.factory.canonical_registry import CanonicalRegistry
+from usdm4_fhir.utility.study_context import StudyContext
+from usdm4_fhir.utility.bundle_writer import BundleWriter
+from usdm4_fhir.factory.base_factory import (
+    trusted_build,
+    trusted_iter,
+    validated_json,
+)
 from simple_error_log.errors import Errors
 from simple_error_log.error_location import KlassMethodLocation
 
@@ -23,17 +33,34 @@ from simple_error_log.error_location import KlassMethodLocation
 class ExportSoA:
     MODULE = "usdm4_fhir.soa.export.Export"
 
-    def __init__(self, study: Study, timeline_id: str, uuid: str, extra: dict = {}):
+    def __init__(
+        self,
+        study: Study,
+        timeline_id: str | list[str] | None,
+        uuid: str,
+        extra: dict = {},
+        context: StudyContext = None,
+        trusted: bool = False,
+        validate: bool = False,
+    ):
         """
-        Initialize the ToFHIRSoA class
+        Initialize the ToFHIRSoA class. The timeline id may be a list of ids,
+        or None for all the design's timelines, to export several timelines
+        in the one bundle. If trusted the resources are built without
+        validation, if validate the finished bundle is validated once
         """
         self._errors = Errors()
         self._study: Study = study
+        self._context = StudyContext.for_study(
+            study, context, self._errors, KlassMethodLocation(self.MODULE, "__init__")
+        )
         self._extra: dict = extra
         self._study_version: StudyVersion = study.first_version()
         self._study_design: StudyDesign = self._study_version.studyDesigns[0]
-        self._timeline: ScheduleTimeline = self._study_design.find_timeline(timeline_id)
+        self._timelines: list[ScheduleTimeline] = self._find_timelines(timeline_id)
         self._uuid = uuid
+        self._trusted = trusted
+        self._validate = validate
 
     @property
     def errors(self) -> Errors:
@@ -44,34 +71,108 @@ class ExportSoA:
         Build the FHIR SoA message
         """
         try:
-            base_url = StudyUrl.generate(self._study)
-            entries = []
-            date = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
-            identifier = IdentifierFactory(
-                errors=self._errors,
-                system="urn:ietf:rfc:3986",
-                value=f"urn:uuid:{self._uuid}",
+            with trusted_build(self._trusted):
+                identifier, date = self._bundle_header()
+                entries = list(self._entries())
+
+                # Build the final bundle
+                bundle = self._bundle(identifier, date, entries)
+            if self._validate:
+                location = KlassMethodLocation(self.MODULE, "to_message")
+                return validated_json(bundle.item, self._errors, location)
+            return bundle.item.json()
+        except Exception as e:
+            location = KlassMethodLocation(self.MODULE, "to_message")
+            self._errors.exception(
+                "Exception raised building FHIR SoA message", e, location
             )
+            return ""
 
-            # Add research study
-            rs = ResearchStudyFactory(self._study, self._errors, self._extra)
-            entries.append(
-                BundleEntryFactory(
-                    errors=self._errors,
-                    request={
-                        "method": "PUT",
-                        "url": "ResearchStudy",
-                    },
-                    resource=rs.item,
-                    fullUrl=URNUUID.generate(),
-                ).item
+    def to_stream(self, fp: TextIO) -> bool:
+        """
+        Write the FHIR SoA message to a file like object as it is built,
+        False, with the output incomplete, if an exception was raised
+        """
+        try:
+            for chunk in trusted_iter(self._chunks(), self._trusted):
+                fp.write(chunk)
+            return True
+        except Exception as e:
+            location = KlassMethodLocation(self.MODULE, "to_stream")
+            self._errors.exception(
+                "Exception raised building FHIR SoA message", e, location
             )
+            return False
 
-            # Add timeline plan definition, this is the overall timeline.
-            tlpd = TimelinePlanDefinitionFactory(
-                self._study, self._timeline, self._errors
+    def iter_chunks(self) -> Iterator[str]:
+        """
+        The FHIR SoA message in chunks, joined they are identical to the
+        to_message result. Stops, with the error logged, on an exception
+        """
+        try:
+            yield from trusted_iter(self._chunks(), self._trusted)
+        except Exception as e:
+            location = KlassMethodLocation(self.MODULE, "iter_chunks")
+            self._errors.exception(
+                "Exception raised building FHIR SoA message", e, location
             )
-            entries.append(
+
+    def _chunks(self) -> Iterator[str]:
+        # Each bundle entry is serialized as soon as it is built and not kept
+        identifier, date = self._bundle_header()
+        bundle = self._bundle(identifier, date, None)
+        writer = BundleWriter(bundle.item, self._errors if self._validate else None)
+        yield from writer.iter_chunks(self._entries())
+
+    def _find_timelines(self, timeline_id: str | list[str] | None) -> list:
+        if timeline_id is None:
+            # The main timeline first, the others in the design's order
+            timelines = self._study_design.scheduleTimelines
+            return sorted(timelines, key=lambda x: not x.mainTimeline)
+        ids = [timeline_id] if isinstance(timeline_id, str) else timeline_id
+        return [self._study_design.find_timeline(x) for x in dict.fromkeys(ids)]
+
+    def _bundle_header(self) -> tuple[IdentifierFactory, str]:
+        date = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
+        identifier = IdentifierFactory(
+            errors=self._errors,
+            system="urn:ietf:rfc:3986",
+            value=f"urn:uuid:{self._uuid}",
+        )
+        return identifier, date
+
+    def _bundle(
+        self, identifier: IdentifierFactory, date: str, entries: list | None
+    ) -> BundleFactory:
+        return BundleFactory(
+            errors=self._errors,
+            id=f"{BundleFactory.fix_id(self._study.name)}",
+            entry=entries,
+            type="transaction",
+            identifier=identifier.item,
+            timestamp=date,
+        )
+
+    def _entries(self) -> Iterator[BundleEntry]:
+        # Add research study, once however many timelines are exported
+        rs = ResearchStudyFactory(self._study, self._errors, self._extra)
+        rs_entry = BundleEntryFactory(
+            errors=self._errors,
+            request={
+                "method": "PUT",
+                "url": "ResearchStudy",
+            },
+            resource=rs.item,
+            fullUrl=URNUUID.generate(),
+        ).item
+
+        # Add the timeline plan definitions, one per timeline exported. The
+        # research study entry follows them as they add the protocol
+        # references to the research study
+        tlpd_entries = []
+        for timeline in self._timelines:
+            tlpd = TimelinePlanDefinitionFactory(self._study, timeline, self._errors)
+            tlpd_entries.append(
                 BundleEntryFactory(
                     errors=self._errors,
                     request={
@@ -83,61 +184,49 @@ class ExportSoA:
                 ).item
             )
             rs.item.protocol.append({"reference": f"PlanDefinition/{tlpd.item.id}"})
+        yield rs_entry
 
-            # Add timepoint plan definitions for the activities
-            for index, tp in enumerate(self._timeline.instances):
+        # Add each timeline followed by the timepoint plan definitions for the
+        # activities, the activity details common to all timepoints are
+        # built once. The canonical urls are registered for the export
+        activity_list = self._context.activity_list()
+        registry = CanonicalRegistry(self._errors)
+        activity_index = ActivityIndex(
+            self._study, activity_list, self._errors, registry
+        )
+        for timeline, tlpd_entry in zip(self._timelines, tlpd_entries):
+            yield tlpd_entry
+            for index, tp in enumerate(timeline.instances):
                 tppd = TimepointPlanDefinitionFactory(
-                    self._study, self._study_design, tp, self._errors
-                )
-                entries.append(
-                    BundleEntryFactory(
-                        errors=self._errors,
-                        request={
-                            "method": "PUT",
-                            "url": "PlanDefinition",
-                        },
-                        resource=tppd.item,
-                        fullUrl=URNUUID.generate(),
-                    ).item
+                    self._study, self._study_design, tp, self._errors, activity_index
                 )
-
-            # Add activity definitions for each activit
-            activity_list = self._study_design.activity_list()
-            for index, activity in enumerate(activity_list):
-                ad = ActivityDefinitionFactory(
+                yield BundleEntryFactory(
                     errors=self._errors,
-                    id=f"{ActivityDefinitionFactory.fix_id(activity.id)}",
-                    name=activity.name,
-                    title=activity.label_name(),
-                    url=f"{base_url}/ActivityDefinition/{ActivityDefinitionFactory.fix_id(activity.name)}",
-                    status="active",
-                    description=activity.description,
-                )
-                entries.append(
-                    BundleEntryFactory(
-                        errors=self._errors,
-                        request={
-                            "method": "PUT",
-                            "url": "ActivityDefinition",
-                        },
-                        resource=ad.item,
-                        fullUrl=URNUUID.generate(),
-                    ).item
-                )
+                    request={
+                        "method": "PUT",
+                        "url": "PlanDefinition",
+                    },
+                    resource=tppd.item,
+                    fullUrl=URNUUID.generate(),
+                ).item
 
-            # Build the final bundle
-            bundle = BundleFactory(
+        # Add activity definitions, one for each distinct definition
+        for index, activity in enumerate(activity_index.definitions):
+            ad = ActivityDefinitionFactory(
                 errors=self._errors,
-                id=f"{BundleFactory.fix_id(self._study.name)}",
-                entry=entries,
-                type="transaction",
-                identifier=identifier.item,
-                timestamp=date,
+                id=f"{ActivityDefinitionFactory.fix_id(activity.id)}",
+                name=activity.name,
+                title=activity.label_name(),
+                url=activity_index.canonical[activity.id],
+                status="active",
+                description=activity.description,
             )
-            return bundle.item.json()
-        except Exception as e:
-            location = KlassMethodLocation(self.MODULE, "to_message")
-            self._errors.exception(
-                "Exception raised building FHIR SoA message", e, location
-            )
-            return ""
+            yield BundleEntryFactory(
+                errors=self._errors,
+                request={
+                    "method": "PUT",
+                    "url": "ActivityDefinition",
+                },
+                resource=ad.item,
+                fullUrl=URNUUID.generate(),
+            ).item
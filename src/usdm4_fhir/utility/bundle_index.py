@@ -0,0 +1,33 @@
+from fhir.resources.bundle import Bundle, BundleEntry
+from fhir.resources.resource import Resource
+
+
+class BundleIndex:
+    """The resources of a bundle indexed, in a single pass, by resource type
+    and by reference, both 'Type/id' and the entry's fullUrl. Where entries
+    share a reference the first wins, as a scan of the entries would find"""
+
+    def __init__(self, bundle: Bundle):
+        self.bundle = bundle
+        self._types: dict[str, list[Resource]] = {}
+        self._references: dict[str, Resource] = {}
+        entry: BundleEntry
+        for entry in bundle.entry or []:
+            resource: Resource = entry.resource
+            if resource is None:
+                continue
+            resource_type = resource.resource_type
+            self._types.setdefault(resource_type, []).append(resource)
+            if resource.id:
+                self._references.setdefault(f"{resource_type}/{resource.id}", resource)
+            if entry.fullUrl:
+                self._references.setdefault(entry.fullUrl, resource)
+
+    def of_type(self, resource_type: str) -> list[Resource]:
+        return self._types.get(resource_type, [])
+
+    def get(self, resource_type: str, reference: str) -> Resource | None:
+        resource = self._references.get(reference)
+        if resource is not None and resource.resource_type == resource_type:
+            return resource
+        return None
@@ -0,0 +1,53 @@
+import os
+import mmap
+from typing import IO, Union
+from fhir.resources.bundle import Bundle
+
+# Where a message can be read from: a file path, an open file (binary or
+# text), raw bytes (including memory mapped), already decoded JSON or a
+# Bundle
+BundleSource = Union[
+    str, os.PathLike, IO, bytes, bytearray, memoryview, mmap.mmap, dict, Bundle
+]
+
+
+def read_json(source: BundleSource) -> dict | Bundle:
+    """Decodes the message source. Files are memory mapped and decoded in
+    place, rather than read into a string first, and decoded JSON and Bundles
+    are returned as is"""
+    if isinstance(source, (dict, Bundle)):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        return _read_path(source)
+    if hasattr(source, "read"):
+        return _decode(source.read())
+    return _decode(source)
+
+
+def to_bundle(data: dict | Bundle) -> Bundle:
+    return data if isinstance(data, Bundle) else Bundle.parse_obj(data)
+
+
+def _read_path(path: str | os.PathLike) -> dict:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files can't be mapped, decoding reports the error
+            return _decode(b"")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return _decode(view)
+
+
+def _decode(data) -> dict:
+    # The decoder fhir.resources is configured with, orjson if installed,
+    # which decodes buffers without a copy. Others need bytes
+    json_loads = Bundle.__config__.json_loads
+    if isinstance(data, mmap.mmap):
+        with memoryview(data) as view:
+            return _decode(view)
+    if isinstance(data, memoryview):
+        try:
+            return json_loads(data)
+        except TypeError:
+            return json_loads(bytes(data))
+    return json_loads(data)
@@ -0,0 +1,35 @@
+from typing import Iterable, Iterator
+from fhir.resources.bundle import Bundle, BundleEntry
+from simple_error_log.errors import Errors
+from simple_error_log.error_location import KlassMethodLocation
+from usdm4_fhir.factory.base_factory import validated_json
+
+
+class BundleWriter:
+    """Serializes a bundle one entry at a time. The chunks joined are identical
+    to the bundle's json() with the entries in place. If errors are given the
+    envelope and each entry are validated as they are written, failures
+    logged in the errors"""
+
+    MODULE = "usdm4_fhir.utility.bundle_writer.BundleWriter"
+
+    def __init__(self, bundle: Bundle, errors: Errors = None):
+        # The bundle without entries. 'entry' is the last element set in the
+        # bundles we write (no 'signature') so entries go before the closing
+        # brace
+        self._errors = errors
+        self._envelope = self._json(bundle)
+
+    def iter_chunks(self, entries: Iterable[BundleEntry]) -> Iterator[str]:
+        yield self._envelope[:-1]
+        separator = ',"entry":['
+        for entry in entries:
+            yield f"{separator}{self._json(entry)}"
+            separator = ","
+        yield "}" if separator != "," else "]}"
+
+    def _json(self, resource) -> str:
+        if self._errors is None:
+            return resource.json()
+        location = KlassMethodLocation(self.MODULE, "iter_chunks")
+        return validated_json(resource, self._errors, location)
@@ -1,9 +1,18 @@
+import sys
+import types
+import typing
 from uuid import UUID
-from datetime import date
+from datetime import date, datetime
+from pydantic import BaseModel
 from usdm4.api.study import Study
 
 
 class DataStore:
+    SCALAR_TYPES = (str, int, float, bool, date, datetime, UUID, type(None))
+
+    # Per-class cache of the indexing details, see _klass_info
+    _klass_infos: dict[type, tuple | None] = {}
+
     def __init__(self, study: Study):
         self._study = study
         self._references = {}
@@ -11,41 +20,74 @@ class DataStore:
 
     def get(self, klass, id):
         try:
-            key = self._key(klass, id)
-            if key in self._references:
-                return self._references[key]
-            else:
-                return None
+            return self._references.get(self._key(klass, id))
         except Exception:
             return None
 
     def _process_node(self, node):
-        if type(node) is list:
-            if node:
-                for item in node:
-                    self._process_node(item)
-        elif type(node) is str:
-            pass
-        elif type(node) is float:
-            pass
-        elif type(node) is date:
-            pass
-        elif type(node) is bool:
-            pass
-        elif type(node) is UUID:
-            pass
-        elif node is None:
-            pass
-        else:
-            if hasattr(node, "instanceType"):
-                key = self._key(node.instanceType, node.id)
-                self._references[key] = node
-            for name, field in node.model_fields.items():
-                self._process_node(getattr(node, name))
-
-    def _key(self, klass, id):
-        klass_name = self._klass_name(klass)
-        return f"{klass_name}.{id}"
-
-    def _klass_name(self, klass):
-        return klass if isinstance(klass, str) else klass.__name__
+        # Explicit stack. Children are pushed in reverse so that the visit
+        # order (and hence which instance wins for a duplicate key) matches a
+        # depth-first, pre-order walk of the model.
+        references = self._references
+        klass_info = self._klass_info
+        stack = [node]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node = pop()
+            if type(node) is list:
+                for item in reversed(node):
+                    push(item)
+                continue
+            info = klass_info(type(node))
+            if info is None:
+                continue
+            indexed, child_fields = info
+            if indexed:
+                references[self._key(sys.intern(node.instanceType), node.id)] = node
+            for name in child_fields:
+                value = getattr(node, name)
+                if value:
+                    push(value)
+
+    @classmethod
+    def _klass_info(cls, klass: type) -> tuple[bool, tuple[str, ...]] | None:
+        """Whether instances of a class are indexed and the fields that can
+        hold child models (in reverse order). None if not a model"""
+        try:
+            return cls._klass_infos[klass]
+        except KeyError:
+            info = None
+            if issubclass(klass, BaseModel):
+                fields = klass.model_fields
+                info = ("instanceType" in fields, cls._model_child_fields(klass))
+            cls._klass_infos[klass] = info
+            return info
+
+    @classmethod
+    def _model_child_fields(cls, klass: type) -> tuple[str, ...]:
+        """Names of the fields that can hold child models, in reverse order"""
+        return tuple(
+            name
+            for name, field in reversed(klass.model_fields.items())
+            if not cls._is_scalar_annotation(field.annotation)
+        )
+
+    @classmethod
+    def _is_scalar_annotation(cls, annotation) -> bool:
+        if annotation in cls.SCALAR_TYPES:
+            return True
+        origin = typing.get_origin(annotation)
+        if origin is typing.Literal:
+            return True
+        if origin is typing.Union or origin is types.UnionType:
+            return all(
+                cls._is_scalar_annotation(x) for x in typing.get_args(annotation)
+            )
+        return False
+
+    def _key(self, klass, id) -> tuple[str, str]:
+        return (
+            klass if type(klass) is str else klass.__name__,
+            id if type(id) is str else str(id),
+        )
@@ -0,0 +1,71 @@
+from usdm4.api.study import Study
+from usdm4.api.narrative_content import NarrativeContent, NarrativeContentItem
+from usdm4.api.eligibility_criterion import EligibilityCriterion
+from usdm4.api.activity import Activity
+from simple_error_log.errors import Errors
+from simple_error_log.error_location import ErrorLocation
+from usdm4_fhir.utility.data_store import DataStore
+
+
+class StudyContext:
+    """Study level state shared by all exports of the same study. Create one
+    for a study and pass it to each export, the state is built on first use
+    and refers to the study's objects, so a context is only valid for the
+    study object it was created with"""
+
+    def __init__(self, study: Study):
+        self.study = study
+        self._data_store = None
+        self._nc_map = None
+        self._nci_map = None
+        self._criterion_map = None
+        self._activity_list = None
+
+    @classmethod
+    def for_study(
+        cls,
+        study: Study,
+        context: "StudyContext | None",
+        errors: Errors,
+        location: ErrorLocation,
+    ) -> "StudyContext":
+        """The context given if it was created for the study, otherwise a new
+        context. A context created for another study is logged as an error"""
+        if context is None:
+            return cls(study)
+        if context.study is study:
+            return context
+        errors.error(
+            "Study context given was created for another study, a new context is used",
+            location,
+        )
+        return cls(study)
+
+    @property
+    def data_store(self) -> DataStore:
+        if self._data_store is None:
+            self._data_store = DataStore(self.study)
+        return self._data_store
+
+    def narrative_content_map(self) -> dict[str, NarrativeContent]:
+        if self._nc_map is None:
+            document_version = self.study.documentedBy[0].versions[0]
+            self._nc_map = document_version.narrative_content_map()
+        return self._nc_map
+
+    def narrative_content_item_map(self) -> dict[str, NarrativeContentItem]:
+        if self._nci_map is None:
+            self._nci_map = self.study.first_version().narrative_content_item_map()
+        return self._nci_map
+
+    def criterion_map(self) -> dict[str, EligibilityCriterion]:
+        if self._criterion_map is None:
+            design = self.study.first_version().studyDesigns[0]
+            self._criterion_map = design.criterion_map()
+        return self._criterion_map
+
+    def activity_list(self) -> list[Activity]:
+        if self._activity_list is None:
+            design = self.study.first_version().studyDesigns[0]
+            self._activity_list = design.activity_list()
+        return self._activity_list
@@ -0,0 +1,97 @@
+import pytest
+from decimal import Decimal
+from pydantic.v1 import ValidationError
+from fhir.resources.bundle import Bundle
+from fhir.resources.coding import Coding
+from fhir.resources.organization import Organization
+from fhir.resources.plandefinition import PlanDefinitionActionRelatedAction
+from fhir.resources.fhirtypes import AddressType
+from simple_error_log.errors import Errors
+from simple_error_log.error_location import KlassMethodLocation
+from usdm4_fhir.factory.base_factory import (
+    BaseFactory,
+    trusted_build,
+    trusted_iter,
+    validated_json,
+    _trusted,
+)
+
+
+def test_build_validated():
+    result = BaseFactory.build(Coding, system="http://example.org", code="C1")
+    assert isinstance(result, Coding)
+    with pytest.raises(ValidationError):
+        BaseFactory.build(Coding, code="C1", userSelected="maybe")
+
+
+def test_build_trusted():
+    kwargs = {"system": "http://example.org", "code": "C1"}
+    expected = BaseFactory.build(Coding, **kwargs)
+    with trusted_build():
+        result = BaseFactory.build(Coding, **kwargs)
+    assert isinstance(result, Coding)
+    assert result.json() == expected.json()
+    assert result.display is None
+
+
+def test_build_trusted_nested():
+    kwargs = {
+        "name": "Org",
+        "contact": [{"address": AddressType(city="Oxford", line=["1 Road"])}],
+    }
+    expected = BaseFactory.build(Organization, **kwargs)
+    with trusted_build():
+        result = BaseFactory.build(Organization, **kwargs)
+        address = BaseFactory.build(AddressType, city="Oxford")
+    assert result.json() == expected.json()
+    assert result.contact[0].address.city == "Oxford"
+    assert address.resource_type == "Address"
+
+
+def test_build_trusted_coerces_primitives():
+    kwargs = {
+        "targetId": "A1",
+        "relationship": "before",
+        "offsetDuration": {"value": "2", "unit": "d"},
+    }
+    expected = BaseFactory.build(PlanDefinitionActionRelatedAction, **kwargs)
+    with trusted_build():
+        result = BaseFactory.build(PlanDefinitionActionRelatedAction, **kwargs)
+        assert result.offsetDuration.value == Decimal("2")
+        with pytest.raises(ValidationError):
+            BaseFactory.build(Coding, code="C1", userSelected="maybe")
+    assert result.json() == expected.json()
+
+
+def test_trusted_build_reset():
+    with trusted_build():
+        assert _trusted.get()
+        with trusted_build(False):
+            assert not _trusted.get()
+        assert _trusted.get()
+    assert not _trusted.get()
+
+
+def test_trusted_iter():
+    def states():
+        for _ in range(2):
+            yield _trusted.get()
+
+    result = []
+    for state in trusted_iter(states()):
+        result.append((state, _trusted.get()))
+    assert result == [(True, False), (True, False)]
+    assert list(trusted_iter(states(), False)) == [False, False]
+
+
+def test_validated_json():
+    errors = Errors()
+    location = KlassMethodLocation("test", "test")
+    bundle = BaseFactory.build(Bundle, type="collection")
+    assert validated_json(bundle, errors, location) == bundle.json()
+    assert errors.count() == 0
+    with trusted_build():
+        bundle = BaseFactory.build(Bundle, type="collection", entry=[{"link": [{}]}])
+    assert validated_json(bundle, errors, location) == bundle.json()
+    assert errors.error_count() == 1
+    assert "FHIR validation failed" in errors.to_dict()[0]["message"]
@@ -0,0 +1,48 @@
+from simple_error_log.errors import Errors
+from usdm4_fhir.factory.canonical_registry import CanonicalRegistry
+
+URL = "http://example.org/ActivityDefinition/vitals"
+
+
+def test_register_new():
+    registry = CanonicalRegistry(Errors())
+    assert registry.register(URL, ("Vitals", "Vitals", ""), "a1") == (URL, True)
+    other = "http://example.org/ActivityDefinition/ecg"
+    assert registry.register(other, ("ECG", "ECG", ""), "a2") == (other, True)
+
+
+def test_register_identical():
+    errors = Errors()
+    registry = CanonicalRegistry(errors)
+    registry.register(URL, ("Vitals", "Vitals", ""), "a1")
+    assert registry.register(URL, ("Vitals", "Vitals", ""), "a2") == (URL, False)
+    assert errors.count() == 0
+
+
+def test_register_collision():
+    errors = Errors()
+    registry = CanonicalRegistry(errors)
+    registry.register(URL, ("Vitals", "Vitals", ""), "a1")
+    assert registry.register(URL, ("VITALS", "Vitals", ""), "a2") == (
+        f"{URL}-a2",
+        True,
+    )
+    assert errors.count() == 1
+    assert errors.to_dict(0)[0]["message"] == (
+        f"Canonical URL '{URL}' already used by a different definition, using '{URL}-a2'"
+    )
+    # The unique URL is then reused for the same definition
+    assert registry.register(URL, ("VITALS", "Vitals", ""), "a2") == (
+        f"{URL}-a2",
+        False,
+    )
+
+
+def test_register_collision_repeated():
+    registry = CanonicalRegistry(Errors())
+    registry.register(URL, ("Vitals", "Vitals", ""), "a1")
+    registry.register(f"{URL}-a2", ("Other", "Other", ""), "a3")
+    assert registry.register(URL, ("VITALS", "Vitals", ""), "a2") == (
+        f"{URL}-a2-a2",
+        True,
+    )
@@ -0,0 +1,63 @@
+import pytest
+from usdm4_fhir.factory.iso8601_ucum import ISO8601ToUCUM
+
+UCUM = "http://unitsofmeasure.org"
+
+
+@pytest.mark.parametrize(
+    "value, number, unit",
+    [
+        ("P1Y", "1", "y"),
+        ("P3M", "3", "m"),
+        ("P2W", "2", "w"),
+        ("P02W", "2", "w"),
+        ("P10D", "10", "d"),
+        ("PT4H", "4", "h"),
+        ("PT0H", "0", "h"),
+        ("PT5M", "5", "min"),
+        ("PT30S", "30", "s"),
+        ("P1.5D", "1.5", "d"),
+        ("PT1,5H", "1.5", "h"),
+    ],
+)
+def test_convert(value, number, unit):
+    assert ISO8601ToUCUM.convert(value) == {
+        "value": number,
+        "unit": unit,
+        "system": UCUM,
+    }
+
+
+@pytest.mark.parametrize(
+    "value, number, unit",
+    [
+        ("P1Y2M", "14", "m"),
+        ("P1DT12H", "36", "h"),
+        ("P2W3D", "17", "d"),
+        ("PT1H30M", "90", "min"),
+        ("P1DT1S", "86401", "s"),
+        # Weeks mixed with months or years are given in days
+        ("P1M1W", "37.4375", "d"),
+        ("P1Y1W", "372.25", "d"),
+    ],
+)
+def test_convert_composite(value, number, unit):
+    assert ISO8601ToUCUM.convert(value) == {
+        "value": number,
+        "unit": unit,
+        "system": UCUM,
+    }
+
+
+@pytest.mark.parametrize("value", ["", "P", "PT", "P2Dx", "2D", "P2H", "-P2D", None])
+def test_convert_invalid(value):
+    assert ISO8601ToUCUM.convert(value) == {}
+
+
+def test_convert_cached():
+    ISO8601ToUCUM._convert.cache_clear()
+    first = ISO8601ToUCUM.convert("P4D")
+    first["value"] = "changed"
+    assert ISO8601ToUCUM.convert("P4D")["value"] == "4"
+    info = ISO8601ToUCUM._convert.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
@@ -0,0 +1,50 @@
+import json
+from usdm4 import USDM4
+from simple_error_log.errors import Errors
+from tests.usdm4_fhir.helpers.files import read_json
+from usdm4_fhir.factory.timeline_plan_definition_factory import (
+    TimelinePlanDefinitionFactory,
+    TimingIndex,
+)
+
+
+def _timeline():
+    path = "tests/usdm4_fhir/test_files/soa/export/pilot_usdm.json"
+    study = USDM4().from_json(json.loads(read_json(path))).study
+    return study, study.versions[0].studyDesigns[0].main_timeline()
+
+
+def test_timing_index():
+    _, timeline = _timeline()
+    index = TimingIndex(timeline)
+    for timepoint in timeline.instances:
+        assert index.timing_from(timepoint.id) is timeline.find_timing_from(
+            timepoint.id
+        )
+    assert index.timing_from("missing") is None
+
+
+def test_timing_index_first_wins():
+    _, timeline = _timeline()
+    first = timeline.timings[0]
+    duplicate = first.model_copy(update={"id": "Timing_X"})
+    timeline.timings.append(duplicate)
+    index = TimingIndex(timeline)
+    assert index.timing_from(first.relativeFromScheduledInstanceId) is first
+
+
+def test_missing_timing():
+    study, timeline = _timeline()
+    timepoint = timeline.instances[1]
+    timeline.timings = [
+        x for x in timeline.timings if x.relativeFromScheduledInstanceId != timepoint.id
+    ]
+    errors = Errors()
+    factory = TimelinePlanDefinitionFactory(study, timeline, errors)
+    assert factory.item is not None
+    action = factory.item.action[1]
+    assert action.relatedAction == []
+    assert errors.error_count() == 1
+    assert errors.to_dict(0)[0]["message"] == (
+        f"No timing found from timepoint '{timepoint.id}', no related action added"
+    )
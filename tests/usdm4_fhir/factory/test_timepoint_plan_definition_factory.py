@@ -0,0 +1,89 @@
+import json
+from usdm4 import USDM4
+from simple_error_log.errors import Errors
+from tests.usdm4_fhir.helpers.files import read_json
+from usdm4_fhir.factory.timepoint_plan_definition_factory import (
+    ActivityIndex,
+    TimepointPlanDefinitionFactory,
+)
+
+
+def _study():
+    path = "tests/usdm4_fhir/test_files/soa/export/pilot_usdm.json"
+    return USDM4().from_json(json.loads(read_json(path))).study
+
+
+def test_activity_index():
+    study = _study()
+    activities = study.versions[0].studyDesigns[0].activity_list()
+    index = ActivityIndex(study, activities, Errors())
+    assert index.base_url == "http://d4k.dk/fhir/vulcan-soa/cdisc-pilot-lzzt"
+    assert index.plan_type.coding[0].code == "clinical-protocol"
+    assert len(index.actions) == len(activities)
+    assert index.actions[activities[0].id] == {
+        "id": "activity-1",
+        "title": "Informed consent",
+        "definitionCanonical": "http://d4k.dk/fhir/vulcan-soa/cdisc-pilot-lzzt/ActivityDefinition/informed-consent",
+    }
+
+
+def test_shared_index():
+    study = _study()
+    design = study.versions[0].studyDesigns[0]
+    errors = Errors()
+    index = ActivityIndex(study, design.activity_list(), errors)
+    for timepoint in design.main_timeline().instances:
+        expected = TimepointPlanDefinitionFactory(study, design, timepoint, errors)
+        shared = TimepointPlanDefinitionFactory(study, design, timepoint, errors, index)
+        assert shared.item.json() == expected.item.json()
+        assert shared.item.type is index.plan_type
+    assert errors.count() == 0
+
+
+def test_unknown_activity():
+    study = _study()
+    design = study.versions[0].studyDesigns[0]
+    errors = Errors()
+    timepoint = design.main_timeline().instances[0]
+    timepoint.activityIds.append("Activity_X")
+    factory = TimepointPlanDefinitionFactory(study, design, timepoint, errors)
+    assert factory.item is None
+    assert errors.error_count() == 1
+
+
+def _duplicate(design, activity, **update):
+    # A copy of the activity appended to the design's activity list
+    last = design.activity_list()[-1]
+    copy = activity.model_copy(
+        update={"id": "Activity_X", "previousId": last.id, "nextId": None, **update}
+    )
+    last.nextId = copy.id
+    design.activities.append(copy)
+    return copy
+
+
+def test_activity_index_identical_definitions():
+    study = _study()
+    design = study.versions[0].studyDesigns[0]
+    first = design.activity_list()[0]
+    copy = _duplicate(design, first)
+    errors = Errors()
+    index = ActivityIndex(study, design.activity_list(), errors)
+    assert index.canonical[copy.id] == index.canonical[first.id]
+    assert copy not in index.definitions
+    assert len(index.definitions) == len(design.activity_list()) - 1
+    assert index.actions[copy.id]["id"] == "activity-x"
+    assert errors.count() == 0
+
+
+def test_activity_index_collision():
+    study = _study()
+    design = study.versions[0].studyDesigns[0]
+    first = design.activity_list()[0]
+    copy = _duplicate(design, first, name="INFORMED CONSENT")
+    errors = Errors()
+    index = ActivityIndex(study, design.activity_list(), errors)
+    assert index.canonical[copy.id] == f"{index.canonical[first.id]}-activity-x"
+    assert index.actions[copy.id]["definitionCanonical"] == index.canonical[copy.id]
+    assert copy in index.definitions
+    assert errors.count() == 1
@@ -0,0 +1,156 @@
+import os
+import time
+import json
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from usdm4 import USDM4
+from tests.usdm4_fhir.helpers.files import read_json, read_yaml
+from tests.usdm4_fhir.helpers.helpers import fix_uuid, fix_iso_dates
+from usdm4_fhir import M11
+from usdm4_fhir.m11.export import batch_export
+from usdm4_fhir.m11.export.batch_export import BatchStatistics
+from usdm4_fhir.m11.export.export_prism2 import ExportPRISM2
+
+PATH = "tests/usdm4_fhir/test_files/m11/export/prism2"
+NAMES = ["pilot", "IGBJ", "ASP8062"]
+
+
+class CrashExport:
+    # Kills the worker process for the studies marked to crash, the others
+    # are slow enough for the crash to be seen while they are in flight
+    def __init__(self, study, extra, trusted=False, validate=False):
+        self.extra = extra
+        self.errors = None
+
+    def to_message(self):
+        if self.extra["crash"]:
+            os._exit(1)
+        time.sleep(0.5)
+        return "{}"
+
+
+class FlagExport:
+    # Returns the build flags it was given as the message
+    def __init__(self, study, extra, trusted=False, validate=False):
+        self.flags = {"trusted": trusted, "validate": validate}
+        self.errors = None
+
+    def to_message(self):
+        return json.dumps(self.flags)
+
+
+class UnpicklableExport(FlagExport):
+    # A message that can't be returned from the worker process
+    def to_message(self):
+        return lambda: None
+
+
+@pytest.fixture(scope="module")
+def items():
+    result = []
+    for name in NAMES:
+        study = USDM4().from_json(json.loads(read_json(f"{PATH}/{name}_usdm.json")))
+        result.append((study.study, read_yaml(f"{PATH}/{name}_extra.yaml")))
+    return result
+
+
+def _message(result) -> str:
+    return fix_uuid(fix_iso_dates(result.message))
+
+
+def _expected(items) -> list[str]:
+    return [
+        fix_uuid(fix_iso_dates(ExportPRISM2(study, extra).to_message()))
+        for study, extra in items
+    ]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_export(items, workers):
+    # The malformed study, no extra, fails without stopping the batch
+    batch = items[:2] + [(items[2][0], {})] + items[2:]
+    statistics = BatchStatistics()
+    results = list(
+        batch_export.export(ExportPRISM2, batch, workers, False, False, statistics)
+    )
+    assert sorted(x.index for x in results) == [0, 1, 2, 3]
+    results = sorted(results, key=lambda x: x.index)
+    expected = _expected(items)
+    assert [_message(x) for x in results if not x.failed] == expected
+    assert results[2].failed
+    assert results[2].errors.error_count() == 1
+    assert "title_page" in results[2].errors.dump(0)
+    assert statistics.studies == 4
+    assert statistics.failed == 1
+    assert statistics.per_second > 0
+
+
+def test_export_worker_crash():
+    batch = [(None, {"crash": True})] + [(None, {"crash": False})] * 6
+    results = list(batch_export.export(CrashExport, batch, 2))
+    assert len(results) == 7
+    results = sorted(results, key=lambda x: x.index)
+    # The studies in flight with the crash are retried, only it fails
+    assert [x.failed for x in results] == [True] + [False] * 6
+    assert "BrokenProcessPool" in results[0].errors.dump(0)
+
+
+class BreakOnSubmit(ProcessPoolExecutor):
+    # A pool found broken when a study is submitted, the first time only
+    broken = False
+
+    def submit(self, *args, **kwargs):
+        if not BreakOnSubmit.broken:
+            BreakOnSubmit.broken = True
+            raise BrokenProcessPool("broken")
+        return super().submit(*args, **kwargs)
+
+
+def test_export_broken_on_submit(monkeypatch):
+    monkeypatch.setattr(batch_export, "ProcessPoolExecutor", BreakOnSubmit)
+    batch = [(None, {"crash": False})] * 3
+    results = list(batch_export.export(CrashExport, batch, 2))
+    assert sorted(x.index for x in results) == [0, 1, 2]
+    assert not any(x.failed for x in results)
+
+
+def test_to_messages(items):
+    instance = M11()
+    results = list(instance.to_messages(items, M11.PRISM2))
+    assert [x.index for x in results] == [0, 1, 2]
+    assert [_message(x) for x in results] == _expected(items)
+    assert instance.statistics.to_dict()["studies"] == 3
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_export_flags(workers):
+    results = list(batch_export.export(FlagExport, [(None, {})], workers, True, True))
+    assert json.loads(results[0].message) == {"trusted": True, "validate": True}
+
+
+def test_export_result_not_returned():
+    results = list(batch_export.export(UnpicklableExport, [(None, {})], 2))
+    assert results[0].failed
+    assert "Exception raised exporting study in batch" in results[0].errors.dump(0)
+
+
+def test_to_messages_validate(mocker):
+    export = mocker.patch.object(batch_export, "export")
+    M11().to_messages([], M11.PRISM2, 0, False, True)
+    assert export.call_args.args[3:5] == (False, True)
+
+
+def test_statistics_from_iteration():
+    # The batch is timed from its first result being asked for
+    statistics = BatchStatistics()
+    results = batch_export.export(FlagExport, [(None, {})], statistics=statistics)
+    assert statistics._start is None
+    next(results)
+    assert statistics._start is not None
+    assert statistics.studies == 1
+
+
+def test_to_messages_version():
+    with pytest.raises(Exception, match="Version parameter 'x' not recognized"):
+        M11().to_messages([], "x")
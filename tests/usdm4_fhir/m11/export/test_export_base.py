@@ -0,0 +1,120 @@
+import json
+import pytest
+from usdm4 import USDM4
+from simple_error_log.errors import Errors
+from tests.usdm4_fhir.helpers.files import read_json, read_yaml
+from tests.usdm4_fhir.helpers.helpers import fix_uuid, fix_iso_dates
+from usdm4_fhir.m11.export import section_renderer
+from usdm4_fhir.m11.export.export_prism2 import ExportPRISM2
+from usdm4_fhir.m11.export.export_prism3 import ExportPRISM3
+from usdm4_fhir.m11.utility.soup import get_soup
+
+PATH = "tests/usdm4_fhir/test_files/m11/export/prism2"
+
+
+@pytest.fixture(scope="module")
+def export():
+    study = USDM4().from_json(json.loads(read_json(f"{PATH}/pilot_usdm.json"))).study
+    return ExportPRISM2(study, read_yaml(f"{PATH}/pilot_extra.yaml"))
+
+
+def _two_parse_div(export, content) -> tuple[str, str]:
+    nci = export._nci_map[content.contentItemId]
+    text = export.tag_ref.translate(nci, nci.text) if nci else ""
+    text = export._remove_line_feeds(text)
+    soup = export._clean_soup(get_soup(text, export.errors))
+    return text, str(soup)
+
+
+def test_narrative_content_div(export):
+    tagged = 0
+    for content in export.protocol_document_version.contents:
+        nci = export._nci_map[content.contentItemId]
+        tagged += 1 if "usdm:" in nci.text else 0
+        text, div = export._narrative_content_div(content)
+        expected_text, expected_div = _two_parse_div(export, content)
+        assert div == expected_div
+        assert text is None or text == expected_text
+    assert tagged > 0
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('<div xmlns="http://www.w3.org/1999/xhtml">\n</div>', ExportPRISM2.EMPTY_DIV),
+        ("\n&nbsp", "&amp;nbsp"),
+        ('<div xmlns="http://www.w3.org/1999/xhtml"><p></p></div>', None),
+        ("<p>A</p><p>B</p>", None),
+    ],
+)
+def test_short_div(export, text, expected):
+    assert export._short_div(get_soup(text, export.errors)) == expected
+
+
+def _message(klass, version, name, workers, **kwargs):
+    base = f"tests/usdm4_fhir/test_files/m11/export/{version}/{name}"
+    study = USDM4().from_json(json.loads(read_json(f"{base}_usdm.json"))).study
+    extra = read_yaml(f"{base}_extra.yaml")
+    export = klass(study, extra, workers=workers, **kwargs)
+    result = fix_uuid(fix_iso_dates(export.to_message()))
+    errors = [(x["level"], x["message"]) for x in export.errors.to_dict(0)]
+    return result, errors
+
+
+@pytest.mark.parametrize(
+    "klass, version, name",
+    [(ExportPRISM2, "prism2", "pilot"), (ExportPRISM3, "prism3", "WA42380")],
+)
+def test_workers(klass, version, name):
+    assert _message(klass, version, name, 2) == _message(klass, version, name, 0)
+
+
+@pytest.mark.parametrize(
+    "klass, version, name",
+    [(ExportPRISM2, "prism2", "pilot"), (ExportPRISM3, "prism3", "WA42380")],
+)
+@pytest.mark.parametrize("workers", [0, 2])
+def test_trusted(klass, version, name, workers):
+    expected = _message(klass, version, name, 0)
+    assert _message(klass, version, name, workers, trusted=True) == expected
+
+
+def test_section_roots(export):
+    roots = export._section_roots()
+    assert roots[0] == export.protocol_document_version.contents[0]
+    processed_map = {}
+    for root in roots:
+        export._mark_processed(root, processed_map)
+    assert len(processed_map) == len(export.protocol_document_version.contents)
+
+
+def test_render_in_process(export):
+    content = export._section_roots()[1]
+    section_renderer._initialise(
+        type(export),
+        export.study,
+        export._extra,
+        export._context,
+        export._now,
+        export._trusted,
+    )
+    section, errors = section_renderer._render("_content_to_section", content.id)
+    assert section == export._content_to_section(content, {})
+    assert errors.count() == 0
+    assert section_renderer._state["exporter"].errors is errors
+    assert export.tag_ref._errors is export.errors
+
+
+def test_recorded_errors_replay():
+    recorded = section_renderer.RecordedErrors()
+    recorded.error("first")
+    recorded.info("second")
+    errors = Errors()
+    errors.warning("before")
+    recorded.replay(errors)
+    assert recorded.count() == 2
+    assert [(x["level"], x["message"]) for x in errors.to_dict(0)] == [
+        ("Warning", "before"),
+        ("Error", "first"),
+        ("Info", "second"),
+    ]
@@ -0,0 +1,76 @@
+import io
+import json
+import pytest
+from usdm4 import USDM4
+from tests.usdm4_fhir.helpers.files import read_json, read_yaml
+from tests.usdm4_fhir.helpers.helpers import fix_uuid, fix_iso_dates
+from usdm4_fhir.m11.export.export_prism3 import ExportPRISM3
+
+PATH = "tests/usdm4_fhir/test_files/m11/export/prism3"
+
+
+def _export(name: str, **kwargs) -> ExportPRISM3:
+    study = USDM4().from_json(json.loads(read_json(f"{PATH}/{name}_usdm.json"))).study
+    return ExportPRISM3(study, read_yaml(f"{PATH}/{name}_extra.yaml"), **kwargs)
+
+
+def _pretty(result: str) -> str:
+    return json.dumps(json.loads(fix_uuid(fix_iso_dates(result))), indent=2)
+
+
+def _messages(export: ExportPRISM3) -> list[tuple[str, str]]:
+    return [(x["level"], x["message"]) for x in export.errors.to_dict(0)]
+
+
+@pytest.mark.parametrize("name", ["TCBCPT_01", "WA42380"])
+def test_to_stream(name):
+    fp = io.StringIO()
+    assert _export(name).to_stream(fp)
+    assert _pretty(fp.getvalue()) == read_json(f"{PATH}/{name}_fhir.json")
+
+
+def test_iter_chunks():
+    chunks = list(_export("TCBCPT_01").iter_chunks())
+    assert len(chunks) > 3
+    assert _pretty("".join(chunks)) == read_json(f"{PATH}/TCBCPT_01_fhir.json")
+
+
+def test_iter_chunks_lazy(mocker):
+    # Each composition is serialized before the next content is rendered
+    export = _export("TCBCPT_01")
+    spy = mocker.spy(export, "_content_to_composition_entry")
+    chunks = export.iter_chunks()
+    next(chunks)
+    assert spy.call_count == 0
+    first = next(chunks)
+    assert '"resourceType":"Composition"' in first
+    rendered = spy.call_count
+    assert rendered < len(export.protocol_document_version.contents)
+    next(chunks)
+    assert spy.call_count > rendered
+
+
+def test_stream_exception(mocker):
+    export = _export("TCBCPT_01")
+    mocker.patch.object(export, "_create_ie_critieria", side_effect=Exception("failed"))
+    assert not export.to_stream(io.StringIO())
+    assert list(export.iter_chunks()) == []
+    assert export.errors.error_count() == 2
+
+
+@pytest.mark.parametrize("name", ["TCBCPT_01", "WA42380"])
+def test_trusted(name):
+    expected = _export(name)
+    expected.to_message()
+    result = _export(name, trusted=True, validate=True)
+    assert _pretty(result.to_message()) == read_json(f"{PATH}/{name}_fhir.json")
+    assert _messages(result) == _messages(expected)
+
+
+def test_trusted_iter_chunks():
+    expected = _export("TCBCPT_01")
+    expected.to_message()
+    export = _export("TCBCPT_01", trusted=True, validate=True)
+    result = "".join(export.iter_chunks())
+    assert _pretty(result) == read_json(f"{PATH}/TCBCPT_01_fhir.json")
+    assert _messages(export) == _messages(expected)
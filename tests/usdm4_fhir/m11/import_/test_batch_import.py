@@ -0,0 +1,129 @@
+import json
+import asyncio
+import threading
+import pytest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from tests.usdm4_fhir.helpers.files import read_json
+from tests.usdm4_fhir.helpers.helpers import fix_uuid
+from simple_error_log.errors import Errors
+from usdm4_fhir import M11
+from usdm4_fhir.m11.import_ import batch_import
+
+PATH = "tests/usdm4_fhir/test_files/m11/import/prism3"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakeImport:
+    # Records the imports in flight and the threads importers are created in
+    active = 0
+    peak = 0
+    threads = set()
+
+    def __init__(self):
+        if FakeImport.active < 0:
+            raise Exception("Failed to create")
+        FakeImport.threads.add(threading.current_thread().name)
+        self.errors = Errors()
+
+    async def from_message(self, path: str, executor=None):
+        FakeImport.active += 1
+        FakeImport.peak = max(FakeImport.peak, FakeImport.active)
+        await asyncio.sleep(0.05 if path == "slow" else 0.01)
+        FakeImport.active -= 1
+        return None if path == "bad" else path
+
+
+@pytest.fixture
+def fake():
+    FakeImport.active = 0
+    FakeImport.peak = 0
+    FakeImport.threads = set()
+    yield FakeImport
+
+
+async def _results(klass, paths, concurrency, executor=None) -> list:
+    return [
+        x
+        async for x in batch_import.import_messages(klass, paths, concurrency, executor)
+    ]
+
+
+@pytest.mark.anyio
+async def test_import_messages(fake):
+    paths = ["slow", "a", "bad", "b", "c"]
+    results = await _results(fake, paths, 2)
+    assert sorted(x.index for x in results) == [0, 1, 2, 3, 4]
+    assert [x.path for x in results][0] != "slow"
+    assert {x.path: x.wrapper for x in results}["a"] == "a"
+    assert [x.path for x in results if x.failed] == ["bad"]
+    assert fake.peak == 2
+    assert "MainThread" not in fake.threads
+
+
+@pytest.mark.anyio
+async def test_import_messages_executor(fake):
+    with ThreadPoolExecutor(1, thread_name_prefix="batch") as executor:
+        results = await _results(fake, ["a", "b"], 4, executor)
+    assert sorted(x.wrapper for x in results) == ["a", "b"]
+    assert all(x.startswith("batch") for x in fake.threads)
+
+
+@pytest.mark.anyio
+async def test_import_messages_exception(fake):
+    fake.active = -1
+    results = await _results(fake, ["a"], 1)
+    assert results[0].failed
+    assert "Failed to create" in results[0].errors.dump(0)
+
+
+@pytest.mark.anyio
+async def test_import_messages_closed(fake):
+    # Imports still in flight when the results are no longer wanted are
+    # cancelled
+    results = batch_import.import_messages(fake, ["a", "slow", "slow"], 3)
+    assert (await results.__anext__()).path == "a"
+    await results.aclose()
+    await asyncio.sleep(0.1)
+    assert fake.active == 2
+
+
+@pytest.mark.anyio
+async def test_from_messages():
+    paths = [f"{PATH}/WA42380_fhir.json", f"{PATH}/missing_fhir.json"]
+    results = [x async for x in M11().from_messages(paths, M11.PRISM3)]
+    results = sorted(results, key=lambda x: x.index)
+    result = json.dumps(json.loads(fix_uuid(results[0].wrapper.to_json())), indent=2)
+    assert result == read_json(f"{PATH}/WA42380_usdm.json")
+    assert results[1].failed
+    assert results[1].errors.error_count() > 0
+
+
+@pytest.mark.anyio
+async def test_from_messages_process_pool():
+    # The errors logged in the worker process are returned with the wrapper
+    paths = [f"{PATH}/WA42380_fhir.json", f"{PATH}/missing_fhir.json"]
+    with ProcessPoolExecutor(1) as executor:
+        results = [x async for x in M11().from_messages(paths, M11.PRISM3, 2, executor)]
+    results = sorted(results, key=lambda x: x.index)
+    result = json.dumps(json.loads(fix_uuid(results[0].wrapper.to_json())), indent=2)
+    assert result == read_json(f"{PATH}/WA42380_usdm.json")
+    assert "Importing FHIR PRISM3" in results[0].errors.dump(0)
+    assert results[1].failed
+    assert results[1].errors.error_count() > 0
+
+
+@pytest.mark.anyio
+async def test_from_messages_prism2_process_pool():
+    with ProcessPoolExecutor(1) as executor:
+        results = [x async for x in M11().from_messages(["a"], M11.PRISM2, 1, executor)]
+    assert results[0].failed
+    assert "can't be run in a process pool executor" in results[0].errors.dump(0)
+
+
+def test_from_messages_version():
+    with pytest.raises(Exception, match="Version parameter 'x' not recognized"):
+        M11().from_messages([], "x")
@@ -0,0 +1,116 @@
+from fhir.resources.bundle import Bundle
+from fhir.resources.extension import Extension
+from usdm4_fhir.m11.import_.import_prism3 import ImportPRISM3
+
+
+def _bundle(*ids: str) -> Bundle:
+    return Bundle.parse_obj(
+        {
+            "resourceType": "Bundle",
+            "type": "document",
+            "entry": [
+                {
+                    "resource": {
+                        "resourceType": "Group",
+                        "id": id,
+                        "type": "person",
+                        "membership": "definitional",
+                    }
+                }
+                for id in ids
+            ],
+        }
+    )
+
+
+def test_extract_from_bundle_type():
+    importer = ImportPRISM3()
+    bundle = _bundle("g1", "g2")
+    assert importer._extract_from_bundle_type(bundle, "Group", first=True).id == "g1"
+    assert [x.id for x in importer._extract_from_bundle_type(bundle, "Group")] == [
+        "g1",
+        "g2",
+    ]
+    assert importer._extract_from_bundle_type(bundle, "ResearchStudy") == []
+    assert importer._extract_from_bundle_type(bundle, "ResearchStudy", True) is None
+    assert importer.errors.count() == 2
+
+
+def test_extract_from_bundle_id():
+    importer = ImportPRISM3()
+    bundle = _bundle("g1", "g2")
+    assert importer._extract_from_bundle_id(bundle, "Group", "Group/g2").id == "g2"
+    assert importer._extract_from_bundle_id(bundle, "Group", "Group/g3") is None
+    assert importer.errors.count() == 1
+
+
+def test_index_built_once_per_bundle():
+    importer = ImportPRISM3()
+    bundle = _bundle("g1")
+    importer._extract_from_bundle_id(bundle, "Group", "Group/g1")
+    index = importer._index
+    importer._extract_from_bundle_type(bundle, "Group")
+    assert importer._index is index
+    other = _bundle("g2")
+    assert importer._extract_from_bundle_id(other, "Group", "Group/g2").id == "g2"
+    assert importer._index is not index
+
+
+def test_extract_from_bundle_exception():
+    importer = ImportPRISM3()
+    assert importer._extract_from_bundle_type(None, "Group") is None
+    assert importer._extract_from_bundle_id(None, "Group", "Group/g1") is None
+    assert importer.errors.error_count() == 2
+
+
+def _extensions() -> list[Extension]:
+    return [
+        Extension(url="a", valueString="a1"),
+        Extension(url="b", valueString="b1"),
+        Extension(url="a", valueString="a2"),
+    ]
+
+
+def test_extract_extension():
+    importer = ImportPRISM3()
+    extensions = _extensions()
+    assert importer._extract_extension(extensions, "a").valueString == "a1"
+    assert importer._extract_extension(extensions, "c") is None
+    assert importer._extract_extension(None, "a") is None
+
+
+def test_extract_extensions():
+    importer = ImportPRISM3()
+    extensions = _extensions()
+    assert [x.valueString for x in importer._extract_extensions(extensions, "a")] == [
+        "a1",
+        "a2",
+    ]
+    assert importer._extract_extensions(extensions, "c") == []
+    assert importer._extract_extensions([], "a") == []
+
+
+def test_extension_map_built_once_per_list():
+    importer = ImportPRISM3()
+    extensions = _extensions()
+    extension_map = importer._extension_map(extensions)
+    assert importer._extension_map(extensions) is extension_map
+    other = _extensions()
+    assert importer._extension_map(other) is not extension_map
+    # The results are copies, callers can't alter the map
+    importer._extract_extensions(extensions, "a").clear()
+    assert len(importer._extract_extensions(extensions, "a")) == 2
+
+
+def test_extract_narrative_references():
+    importer = ImportPRISM3()
+    url = "http://hl7.org/fhir/uv/pharmaceutical-research-protocol/StructureDefinition/narrative-elements"
+    extensions = [
+        Extension(url=url, valueReference={"reference": "Composition/c1"}),
+        Extension(url="a", valueString="a1"),
+        Extension(url=url, valueReference={"reference": "Composition/c2"}),
+    ]
+    assert importer._extract_narrative_references(extensions) == [
+        "Composition/c1",
+        "Composition/c2",
+    ]
@@ -0,0 +1,116 @@
+import pytest
+from types import SimpleNamespace
+from simple_error_log.errors import Errors
+from usdm4_fhir.m11.import_.title_page import TitlePage
+
+TITLE_TABLE = """<div><table>
+<tr><td>Sponsor Confidentiality Statement:</td><td><p>Confidential</p></td></tr>
+<tr><td>Full Title:</td><td><p>A Study of Something</p></td></tr>
+<tr><td>Acronym:</td><td><p>ASOS</p></td></tr>
+<tr><td>Trial Phase:</td><td><p>Phase</p><p>3</p></td></tr>
+<tr><td>Compound Code(s):</td></tr>
+<tr><td>Full Title (repeated):</td><td><p>Another Title</p></td></tr>
+<tr><th>Heading</th></tr>
+</table></div>"""
+OTHER_TABLE = "<div><table><tr><td>Other</td><td><p>Value</p></td></tr></table></div>"
+
+
+@pytest.fixture
+def title_page(monkeypatch):
+    monkeypatch.setenv("ADDRESS_SERVER_URL", "http://localhost")
+
+    def _title_page(*texts: str) -> TitlePage:
+        items = [SimpleNamespace(id=f"I{i}", text=x) for i, x in enumerate(texts)]
+        sections = [SimpleNamespace(contentItemId=x.id) for x in items]
+        return TitlePage(sections, items, Errors())
+
+    return _title_page
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def test_title_table(title_page):
+    page = title_page("<div>&nbsp</div>", OTHER_TABLE, TITLE_TABLE)
+    rows = page._title_table(page._sections, page._items)
+    assert rows == {
+        "Sponsor Confidentiality": "Confidential",
+        "Full Title": "A Study of Something",
+        "Acronym": "ASOS",
+        "Trial Phase": "Phase\n3",
+        "Compound Code": "",
+    }
+
+
+def test_title_table_not_found(title_page):
+    page = title_page("<div>&nbsp</div>", OTHER_TABLE)
+    assert page._title_table(page._sections, page._items) is None
+    assert page._errors.to_dict(0)[-1]["message"] == (
+        "Cannot locate M11 title page table!"
+    )
+
+
+def test_table_get_row(title_page):
+    page = title_page(TITLE_TABLE)
+    rows = page._title_table(page._sections, page._items)
+    assert page._table_get_row(rows, "Acronym") == "ASOS"
+    assert page._table_get_row(rows, "Compound Code") == ""
+    assert page._table_get_row(rows, "Short Title") == ""
+    assert page._table_get_row(None, "Acronym") == ""
+    messages = [x["message"] for x in page._errors.to_dict(0)[-4:]]
+    assert messages == [
+        "Decoded M11 FHIR message Acronym = ASOS",
+        "Decoded M11 FHIR message Compound Code = ",
+        "Failed to decode M11 FHIR message Short Title",
+        "Failed to decode M11 FHIR message Acronym",
+    ]
+
+
+def test_title_table_soups(title_page, mocker):
+    # Only sections that may hold the title page are parsed, the rows once
+    page = title_page("<div>&nbsp</div>", OTHER_TABLE, TITLE_TABLE)
+    get_soup = mocker.spy(page, "_get_soup")
+    page._title_table(page._sections, page._items)
+    assert get_soup.call_count == 1
+
+
+def test_title_table_markup_in_label(title_page):
+    text = "<table><tr><td>Full <b>Title</b></td><td><p>T</p></td></tr></table>"
+    page = title_page(OTHER_TABLE, text)
+    rows = page._title_table(page._sections, page._items)
+    assert rows == {"Full Title": "T"}
+
+
+def test_title_table_missing_item(title_page):
+    page = title_page(TITLE_TABLE)
+    page._sections.insert(0, SimpleNamespace(contentItemId="missing"))
+    rows = page._title_table(page._sections, page._items)
+    assert rows["Full Title"] == "A Study of Something"
+
+
+def test_may_be_title_page(title_page):
+    page = title_page()
+    assert page._may_be_title_page(TITLE_TABLE)
+    assert page._may_be_title_page("<TABLE><tr><td>FULL TITLE</td></tr></TABLE>")
+    assert not page._may_be_title_page(OTHER_TABLE)
+    assert not page._may_be_title_page("<div>Full Title</div>")
+
+
+@pytest.mark.anyio
+async def test_read_before_process(title_page, mocker):
+    # The table parsed by read isn't parsed again by process
+    page = title_page(OTHER_TABLE, TITLE_TABLE)
+    title_table = mocker.spy(page, "_title_table")
+    page.read()
+    await page.process()
+    assert title_table.call_count == 1
+    assert page.full_title == "A Study of Something"
+
+
+@pytest.mark.anyio
+async def test_process_reads(title_page):
+    page = title_page(TITLE_TABLE)
+    await page.process()
+    assert page.acronym == "ASOS"
@@ -0,0 +1,130 @@
+import glob
+import warnings
+import json
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from bs4 import BeautifulSoup
+from bs4.builder import ParserRejectedMarkup, XMLParsedAsHTMLWarning
+from usdm4 import USDM4
+from simple_error_log.errors import Errors
+from tests.usdm4_fhir.helpers.files import read_json
+from usdm4_fhir.m11.utility.soup import (
+    get_soup,
+    locator_warning,
+    parse_with_warnings,
+    parse,
+    URL_MESSAGE,
+    FILENAME_MESSAGE,
+)
+
+USDM_FILES = sorted(
+    glob.glob("tests/usdm4_fhir/test_files/**/*_usdm.json", recursive=True)
+)
+
+
+def _study(filename: str):
+    return USDM4().from_json(json.loads(read_json(filename))).study
+
+
+@pytest.mark.parametrize("filename", USDM_FILES)
+def test_narrative_conformance(filename):
+    for item in _study(filename).versions[0].narrativeContentItems:
+        errors = Errors()
+        with warnings.catch_warnings(record=True) as warning_list:
+            expected = str(BeautifulSoup(item.text, "html.parser"))
+        assert str(get_soup(item.text, errors)) == expected
+        assert errors.count() == len(warning_list)
+
+
+def test_locator_warning():
+    assert locator_warning("http://example.com") == URL_MESSAGE
+    assert locator_warning("see section 1/2") == FILENAME_MESSAGE
+    assert locator_warning("PROTOCOL.HTML") == FILENAME_MESSAGE
+    assert locator_warning("http://example.com x") == FILENAME_MESSAGE
+    assert locator_warning("short text") is None
+    assert locator_warning("<p>http://example.com</p>") is None
+    assert locator_warning("x" * 300 + "/") is None
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "http://example.com",
+        "protocol.html",
+        "a\\b",
+        "plain",
+        '<?xml version="1.0"?><a>x</a>',
+        '<?xml version="1.0"?><html>x</html>',
+        '<?php x ?><?xml version="1.0"?><a>x</a>',
+        '<b>x</b><?xml version="1.0"?><a>x</a>',
+        b"http://example.com",
+    ],
+)
+def test_warnings_match_soup(text):
+    with warnings.catch_warnings(record=True) as warning_list:
+        warnings.simplefilter("always")
+        expected = BeautifulSoup(text, "html.parser")
+    result, messages = parse_with_warnings(text)
+    assert str(result) == str(expected)
+    assert str(parse(text)) == str(expected)
+    assert messages == [str(x.message) for x in warning_list]
+
+
+def test_xml_warning_not_filtered():
+    # Only the warnings raised against this package's soup module are
+    # ignored, those for XML parsed as HTML elsewhere are left alone
+    assert not [x for x in warnings.filters if x[2] is XMLParsedAsHTMLWarning]
+    with warnings.catch_warnings(record=True) as warning_list:
+        warnings.simplefilter("always")
+        parse('<?xml version="1.0"?><a>x</a>')
+    assert warning_list == []
+
+
+def test_no_warning_capture(monkeypatch):
+    # Parsing must not swap the global warning state
+    def fail(*args, **kwargs):
+        raise AssertionError("catch_warnings used")
+
+    monkeypatch.setattr(warnings, "catch_warnings", fail)
+    assert parse_with_warnings("http://example.com")[1] == [URL_MESSAGE]
+    assert parse_with_warnings('<?xml version="1.0"?><a>x</a>')[1] != []
+
+
+def test_parse_with_warnings():
+    result, messages = parse_with_warnings("http://example.com")
+    assert str(result) == "http://example.com"
+    assert len(messages) == 1
+    assert "looks more like a URL" in messages[0]
+    result, messages = parse_with_warnings('<?xml version="1.0"?><a>x</a>')
+    assert len(messages) == 1
+    assert parse_with_warnings("<p>http://example.com</p>")[1] == []
+
+
+def test_get_soup_threads():
+    texts = ["<p>A</p>", "http://example.com", "protocol.html", "<b>B</b>"] * 50
+
+    def run(text):
+        errors = Errors()
+        return str(get_soup(text, errors)), errors.count()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(run, texts))
+    assert results == [run(x) for x in texts]
+    assert [x[1] for x in results[:4]] == [0, 1, 1, 0]
+
+
+def test_rejected_markup():
+    # As html.parser through Soup, markup the parser fails on is rejected
+    with pytest.raises(ParserRejectedMarkup):
+        BeautifulSoup("<![foo x", "html.parser")
+    with pytest.raises(ParserRejectedMarkup):
+        parse("<![foo x")
+    errors = Errors()
+    assert str(get_soup("<![foo x", errors)) == ""
+    assert errors.error_count() == 1
+
+
+def test_get_soup_exception():
+    errors = Errors()
+    assert str(get_soup(None, errors)) == ""
+    assert errors.count() == 1
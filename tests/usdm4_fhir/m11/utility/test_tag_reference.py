@@ -0,0 +1,143 @@
+import json
+import pytest
+from usdm4 import USDM4
+from simple_error_log.errors import Errors
+from tests.usdm4_fhir.helpers.files import read_json
+from usdm4_fhir.utility.data_store import DataStore
+from usdm4_fhir.m11.utility.tag_reference import TagReference
+from usdm4_fhir.m11.utility.soup import get_soup
+
+
+@pytest.fixture(scope="module")
+def study():
+    path = "tests/usdm4_fhir/test_files/m11/export/prism2/pilot_usdm.json"
+    return USDM4().from_json(json.loads(read_json(path))).study
+
+
+def _criterion_item(study, tag: str):
+    items = study.versions[0].eligibilityCriterionItems
+    return next(x for x in items if f'usdm:tag name="{tag}"' in x.text)
+
+
+def test_translate_ref(study):
+    tag_ref = TagReference(DataStore(study), Errors())
+    title = study.versions[0].titles[0]
+    text = f'<p><usdm:ref klass="StudyTitle" id="{title.id}" attribute="text"></usdm:ref></p>'
+    assert tag_ref.translate(None, text) == f"<p>{title.text}</p>"
+    assert tag_ref.cache.stats()["misses"] == 1
+    assert tag_ref.translate(None, text + text) == f"<p>{title.text}</p>" * 2
+    assert tag_ref.cache.stats()["hits"] == 2
+
+
+def test_translate_tag(study):
+    tag_ref = TagReference(DataStore(study), Errors())
+    item = _criterion_item(study, "min_age")
+    expected = tag_ref.translate(item, item.text)
+    assert "usdm:" not in expected
+    assert tag_ref.cache.stats() == {
+        "hits": 0,
+        "misses": 2,
+        "size": 2,
+        "maxsize": 1024,
+    }
+    assert tag_ref.translate(item, item.text) == expected
+    assert tag_ref.cache.stats()["hits"] == 1
+
+
+def test_cached_matches_uncached(study):
+    cached = TagReference(DataStore(study), Errors())
+    uncached = TagReference(DataStore(study), Errors(), cache_size=0)
+    for item in study.versions[0].eligibilityCriterionItems * 2:
+        assert cached.translate(item, item.text) == uncached.translate(item, item.text)
+    assert cached.cache.stats()["hits"] > 0
+    assert uncached.cache.stats()["hits"] == 0
+
+
+def test_failure_not_cached(study):
+    errors = Errors()
+    tag_ref = TagReference(DataStore(study), errors)
+    item = _criterion_item(study, "min_age")
+    text = '<p><usdm:tag name="missing"></usdm:tag></p>'
+    assert tag_ref.translate(item, text) == "<p><i>tag 'missing' not found</i></p>"
+    assert tag_ref.translate(item, text) == "<p><i>tag 'missing' not found</i></p>"
+    assert errors.error_count() == 2
+    assert len(tag_ref.cache) == 0
+
+
+def test_translate_empty(study):
+    tag_ref = TagReference(DataStore(study), Errors())
+    assert tag_ref.translate(None, "") == ""
+    assert tag_ref.translate(None, None) == ""
+
+
+def test_has_tags():
+    assert TagReference.has_tags('<usdm:ref klass="X" id="1" attribute="a"/>')
+    assert TagReference.has_tags('<p><USDM:TAG name="x"></USDM:TAG></p>')
+    assert not TagReference.has_tags("<p>usdm:ref</p>")
+    assert not TagReference.has_tags("<usdm:reference></usdm:reference>")
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Plain text, no markup",
+        "<p>Some <b>bold</b>\n\n text</p>",
+        "Ampersand &amp; and &nbsp",
+        "  \n  ",
+        "see section 1/2",
+        "http://example.com",
+        "protocol.html",
+        "x" * 300 + "/",
+    ],
+)
+def test_translate_no_tags(study, text):
+    errors = Errors()
+    expected_errors = Errors()
+    tag_ref = TagReference(DataStore(study), errors)
+    expected = str(get_soup(text, expected_errors))
+    assert tag_ref.translate(None, text) == expected
+    assert errors.count() == expected_errors.count()
+    assert len(tag_ref.cache) == 0
+
+
+def test_parameter_map(study):
+    tag_ref = TagReference(DataStore(study), Errors())
+    item = _criterion_item(study, "min_age")
+    dictionary = DataStore(study).get("SyntaxTemplateDictionary", item.dictionaryId)
+    parameter_map = tag_ref._parameter_map(item.dictionaryId)
+    assert len(parameter_map) == len({x.tag for x in dictionary.parameterMaps})
+    assert parameter_map["min_age"] == next(
+        x.reference for x in dictionary.parameterMaps if x.tag == "min_age"
+    )
+    assert tag_ref._parameter_map(item.dictionaryId) is parameter_map
+    assert tag_ref._parameter_map("missing") is None
+
+
+def test_cache_text_and_fragments(study):
+    study = study.model_copy(deep=True)
+    tag_ref = TagReference(DataStore(study), Errors())
+    title = study.versions[0].titles[0]
+    text = f'<usdm:ref klass="StudyTitle" id="{title.id}" attribute="text"></usdm:ref>'
+    tag_ref.translate(None, f"<p>{text}</p>")
+    key = ("ref", "StudyTitle", title.id, "text")
+    assert tag_ref.cache.get(key) == title.text
+    title.text = "<b>Bold &amp; title</b>"
+    uncached = TagReference(DataStore(study), Errors(), cache_size=0)
+    expected = uncached.translate(None, f"<p>{text}</p>")
+    tag_ref.cache.clear()
+    assert tag_ref.translate(None, f"<p>{text}</p>") == expected
+    assert not isinstance(tag_ref.cache.get(key), str)
+    assert tag_ref.translate(None, f"<p>{text}{text}</p>") == expected.replace(
+        "</b></p>", "</b><b>Bold &amp; title</b></p>"
+    )
+
+
+def test_no_dictionary(study):
+    errors = Errors()
+    tag_ref = TagReference(DataStore(study), errors)
+    item = _criterion_item(study, "min_age").model_copy(
+        update={"dictionaryId": "missing"}
+    )
+    text = '<p><usdm:tag name="min_age"></usdm:tag></p>'
+    assert tag_ref.translate(item, text) == "<p><i>no dictionary found</i></p>"
+    assert errors.error_count() == 1
@@ -1,3 +1,4 @@
+import io
 import json
 from tests.usdm4_fhir.helpers.files import read_yaml, write_json, read_json
 from tests.usdm4_fhir.helpers.helpers import fix_uuid, fix_iso_dates
@@ -37,3 +38,135 @@ def _full_path(filename, version, mode):
 
 def test_from_fhir_pilot():
     _run_test_to("pilot", SAVE)
+
+
+def _export(name, **kwargs):
+    path = _full_path(f"{name}_usdm.json", "", "export")
+    study = USDM4().from_json(json.loads(read_json(path))).study
+    extra = read_yaml(_full_path(f"{name}_extra.yaml", "", "export"))
+    timeline_id = study.first_version().studyDesigns[0].main_timeline().id
+    return ExportSoA(study, timeline_id, "FAKE-UUID", extra, **kwargs)
+
+
+def test_to_stream_pilot():
+    fp = io.StringIO()
+    assert _export("pilot").to_stream(fp)
+    result = fix_uuid(fix_iso_dates(fp.getvalue()))
+    expected = read_json(_full_path("pilot_fhir_soa.json", "", "export"))
+    assert json.dumps(json.loads(result), indent=2) == expected
+
+
+def test_iter_chunks_pilot():
+    export = _export("pilot")
+    chunks = list(export.iter_chunks())
+    assert len(chunks) > 3
+    result = fix_uuid(fix_iso_dates("".join(chunks)))
+    assert result == fix_uuid(fix_iso_dates(_export("pilot").to_message()))
+
+
+def test_stream_exception(mocker):
+    export = _export("pilot")
+    mocker.patch.object(export, "_entries", side_effect=Exception("failed"))
+    assert not export.to_stream(io.StringIO())
+    assert list(export.iter_chunks()) == []
+    assert export.errors.error_count() == 2
+
+
+def test_trusted_pilot():
+    result = _export("pilot", trusted=True).to_message()
+    result = fix_uuid(fix_iso_dates(result))
+    expected = read_json(_full_path("pilot_fhir_soa.json", "", "export"))
+    assert json.dumps(json.loads(result), indent=2) == expected
+
+
+def test_trusted_validate_pilot():
+    # The amendment identifier is empty in the pilot, caught by validation
+    export = _export("pilot", trusted=True, validate=True)
+    assert export.to_message()
+    assert export.errors.error_count() == 1
+    assert "FHIR validation failed" in export.errors.to_dict()[0]["message"]
+
+
+def _timelines(name):
+    path = _full_path(f"{name}_usdm.json", "", "export")
+    study = USDM4().from_json(json.loads(read_json(path))).study
+    extra = read_yaml(_full_path(f"{name}_extra.yaml", "", "export"))
+    return study, extra, study.first_version().studyDesigns[0].scheduleTimelines
+
+
+def test_all_timelines_pilot():
+    study, extra, timelines = _timelines("pilot")
+    export = ExportSoA(study, None, "FAKE-UUID", extra)
+    entries = [x["resource"] for x in json.loads(export.to_message())["entry"]]
+    assert export.errors.error_count() == 0
+    types = [x["resourceType"] for x in entries]
+    activities = study.first_version().studyDesigns[0].activity_list()
+    assert types.count("ResearchStudy") == 1
+    assert types.count("ActivityDefinition") == len(activities)
+    assert types.count("PlanDefinition") == len(timelines) + sum(
+        len(x.instances) for x in timelines
+    )
+    ids = [x["id"] for x in entries if "id" in x]
+    assert len(ids) == len(set(ids))
+    main = next(x for x in timelines if x.mainTimeline)
+    references = [x["reference"] for x in entries[0]["protocol"]]
+    assert references[0] == f"PlanDefinition/{main.id.lower().replace('_', '-')}"
+    assert len(references) == len(timelines)
+    # Each timeline is followed by its timepoints
+    assert entries[1]["id"] == references[0].split("/")[1]
+    assert len(entries[1]["action"]) == len(main.instances)
+
+
+def test_timeline_list_pilot():
+    study, extra, timelines = _timelines("pilot")
+    main = next(x for x in timelines if x.mainTimeline)
+    result = ExportSoA(study, [main.id, main.id], "FAKE-UUID", extra).to_message()
+    expected = read_json(_full_path("pilot_fhir_soa.json", "", "export"))
+    result = fix_uuid(fix_iso_dates(result))
+    assert json.dumps(json.loads(result), indent=2) == expected
+
+
+def test_all_timelines_iter_chunks_pilot():
+    study, extra, timelines = _timelines("pilot")
+    chunks = ExportSoA(study, None, "FAKE-UUID", extra).iter_chunks()
+    result = fix_uuid(fix_iso_dates("".join(chunks)))
+    expected = ExportSoA(study, None, "FAKE-UUID", extra).to_message()
+    assert result == fix_uuid(fix_iso_dates(expected))
+
+
+def _activity_definitions(export: ExportSoA) -> list[dict]:
+    entries = json.loads(export.to_message())["entry"]
+    return [
+        x["resource"]
+        for x in entries
+        if x["resource"]["resourceType"] == "ActivityDefinition"
+    ]
+
+
+def test_duplicate_activity_definitions_pilot():
+    study, extra, timelines = _timelines("pilot")
+    design = study.first_version().studyDesigns[0]
+    activities = design.activity_list()
+    expected = len(activities)
+    last = activities[-1]
+    identical = activities[0].model_copy(
+        update={"id": "Activity_X", "previousId": last.id, "nextId": "Activity_Y"}
+    )
+    collision = activities[1].model_copy(
+        update={"id": "Activity_Y", "previousId": "Activity_X", "nextId": None}
+    )
+    collision.name = collision.name.upper()
+    last.nextId = identical.id
+    design.activities += [identical, collision]
+    main = design.main_timeline()
+    main.instances[0].activityIds += [identical.id, collision.id]
+    export = ExportSoA(study, main.id, "FAKE-UUID", extra)
+    definitions = _activity_definitions(export)
+    urls = [x["url"] for x in definitions]
+    assert len(definitions) == expected + 1
+    assert len(urls) == len(set(urls))
+    assert urls[-1].endswith("-activity-y")
+    assert "already used by a different definition" in export.errors.dump(0)
+    timepoint = json.loads(export.to_message())["entry"][2]["resource"]
+    canonicals = [x["definitionCanonical"] for x in timepoint["action"][-2:]]
+    assert canonicals == [urls[0], urls[-1]]
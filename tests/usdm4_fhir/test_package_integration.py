@@ -122,3 +122,20 @@ async def test_from_fhir_prism3_asp8063():
 
 def test_to_fhir_soa_pilot():
     run_test_to_soa("pilot1", SAVE)
+
+
+def test_timelines_to_message_soa_pilot1():
+    path = _full_soa_path("pilot1_usdm.json", "", "export")
+    study = USDM4().from_json(json.loads(read_json(path))).study
+    extra = read_yaml(_full_soa_path("pilot1_extra.yaml", "", "export"))
+    main = study.first_version().studyDesigns[0].main_timeline()
+    soa = SoA()
+    result = soa.timelines_to_message(study, [main.id], "FAKE-UUID", extra)
+    result = fix_uuid(fix_iso_dates(result))
+    expected = read_json(_full_soa_path("pilot1_fhir_soa.json", "", "export"))
+    assert json.dumps(json.loads(result), indent=2) == expected
+    result = json.loads(soa.timelines_to_message(study, None, "FAKE-UUID", extra))
+    assert len(result["entry"][0]["resource"]["protocol"]) == len(
+        study.first_version().studyDesigns[0].scheduleTimelines
+    )
+    assert soa.errors.error_count() == 0
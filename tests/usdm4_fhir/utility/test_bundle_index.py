@@ -0,0 +1,75 @@
+from fhir.resources.bundle import Bundle
+from usdm4_fhir.utility.bundle_index import BundleIndex
+
+
+def _bundle() -> Bundle:
+    return Bundle.parse_obj(
+        {
+            "resourceType": "Bundle",
+            "type": "document",
+            "entry": [
+                {
+                    "fullUrl": "urn:uuid:g1",
+                    "resource": {
+                        "resourceType": "Group",
+                        "id": "g1",
+                        "type": "person",
+                        "membership": "definitional",
+                    },
+                },
+                {
+                    "resource": {
+                        "resourceType": "Group",
+                        "id": "g2",
+                        "type": "person",
+                        "membership": "definitional",
+                    },
+                },
+                {
+                    "resource": {
+                        "resourceType": "Group",
+                        "id": "g1",
+                        "type": "device",
+                        "membership": "definitional",
+                    },
+                },
+                {"fullUrl": "urn:uuid:empty"},
+                {
+                    "fullUrl": "urn:uuid:o1",
+                    "resource": {"resourceType": "Organization", "name": "Org"},
+                },
+            ],
+        }
+    )
+
+
+def test_of_type():
+    index = BundleIndex(_bundle())
+    assert [x.id for x in index.of_type("Group")] == ["g1", "g2", "g1"]
+    assert [x.name for x in index.of_type("Organization")] == ["Org"]
+    assert index.of_type("Composition") == []
+
+
+def test_get():
+    index = BundleIndex(_bundle())
+    assert index.get("Group", "Group/g2").id == "g2"
+    assert index.get("Group", "urn:uuid:g1").id == "g1"
+    assert index.get("Organization", "urn:uuid:o1").name == "Org"
+
+
+def test_get_first_wins():
+    index = BundleIndex(_bundle())
+    assert index.get("Group", "Group/g1").type == "person"
+
+
+def test_get_not_found():
+    index = BundleIndex(_bundle())
+    assert index.get("Group", "Group/g3") is None
+    assert index.get("Organization", "urn:uuid:g1") is None
+    assert index.get("Group", "urn:uuid:empty") is None
+
+
+def test_no_entries():
+    index = BundleIndex(Bundle(type="document"))
+    assert index.of_type("Group") == []
+    assert index.get("Group", "Group/g1") is None
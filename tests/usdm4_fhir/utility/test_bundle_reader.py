@@ -0,0 +1,66 @@
+import io
+import json
+import mmap
+import pytest
+from pathlib import Path
+from fhir.resources.bundle import Bundle
+from usdm4_fhir.utility.bundle_reader import read_json, to_bundle
+
+BUNDLE = {"resourceType": "Bundle", "id": "b1", "type": "document"}
+RAW = json.dumps(BUNDLE).encode()
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "bundle.json"
+    path.write_bytes(RAW)
+    return path
+
+
+def test_path(path):
+    assert read_json(str(path)) == BUNDLE
+    assert read_json(Path(path)) == BUNDLE
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.json"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        read_json(path)
+
+
+def test_buffers():
+    assert read_json(RAW) == BUNDLE
+    assert read_json(bytearray(RAW)) == BUNDLE
+    assert read_json(memoryview(RAW)) == BUNDLE
+
+
+def test_mmap(path):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            assert read_json(mapped) == BUNDLE
+
+
+def test_file_objects(path):
+    assert read_json(io.BytesIO(RAW)) == BUNDLE
+    with open(path) as f:
+        assert read_json(f) == BUNDLE
+
+
+def test_decoded():
+    bundle = Bundle.parse_obj(BUNDLE)
+    assert read_json(BUNDLE) is BUNDLE
+    assert read_json(bundle) is bundle
+
+
+def test_memoryview_fallback(monkeypatch):
+    # A decoder, such as the standard library's, that doesn't take buffers
+    monkeypatch.setattr(Bundle.__config__, "json_loads", json.loads)
+    assert read_json(memoryview(RAW)) == BUNDLE
+
+
+def test_to_bundle():
+    bundle = to_bundle(BUNDLE)
+    assert isinstance(bundle, Bundle)
+    assert bundle.id == "b1"
+    assert to_bundle(bundle) is bundle
@@ -0,0 +1,21 @@
+from fhir.resources.bundle import Bundle, BundleEntry
+from fhir.resources.group import Group
+from usdm4_fhir.utility.bundle_writer import BundleWriter
+
+
+def _entry(id: str) -> BundleEntry:
+    group = Group(id=id, type="person", membership="definitional")
+    return BundleEntry(resource=group, request={"method": "PUT", "url": f"Group/{id}"})
+
+
+def test_iter_chunks():
+    entries = [_entry("g1"), _entry("g2")]
+    writer = BundleWriter(Bundle(id="b1", type="transaction"))
+    expected = Bundle(id="b1", type="transaction", entry=entries).json()
+    assert "".join(writer.iter_chunks(iter(entries))) == expected
+
+
+def test_iter_chunks_no_entries():
+    writer = BundleWriter(Bundle(id="b1", type="transaction"))
+    expected = Bundle(id="b1", type="transaction", entry=[]).json()
+    assert "".join(writer.iter_chunks([])) == expected
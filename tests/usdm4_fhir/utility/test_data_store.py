@@ -0,0 +1,76 @@
+import json
+from usdm4 import USDM4
+from usdm4.api.code import Code
+from usdm4.api.study_design import StudyDesign, InterventionalStudyDesign
+from usdm4.api.syntax_template_dictionary import ParameterMap, SyntaxTemplateDictionary
+from usdm4.api.extension import ExtensionAttribute
+from tests.usdm4_fhir.helpers.files import read_json
+from usdm4_fhir.utility.data_store import DataStore
+
+
+def _study(name: str = "prism3/TCBCPT_01"):
+    path = f"tests/usdm4_fhir/test_files/m11/export/{name}_usdm.json"
+    return USDM4().from_json(json.loads(read_json(path))).study
+
+
+def _recursive_walk(node, references: dict):
+    if type(node) is list:
+        for item in node:
+            _recursive_walk(item, references)
+    elif hasattr(node, "model_fields"):
+        if hasattr(node, "instanceType"):
+            references[f"{node.instanceType}.{node.id}"] = node
+        for name in node.model_fields:
+            _recursive_walk(getattr(node, name), references)
+
+
+def test_index_matches_recursive_walk():
+    study = _study()
+    expected = {}
+    _recursive_walk(study, expected)
+    data_store = DataStore(study)
+    assert len(data_store._references) == len(expected)
+    for key, value in expected.items():
+        klass, id = key.split(".", 1)
+        assert data_store.get(klass, id) is value
+
+
+def test_get():
+    study = _study()
+    data_store = DataStore(study)
+    design = study.versions[0].studyDesigns[0]
+    assert data_store.get(InterventionalStudyDesign, design.id) is design
+    assert data_store.get("InterventionalStudyDesign", design.id) is design
+    assert data_store.get(StudyDesign, design.id) is None
+    assert data_store.get(None, design.id) is None
+
+
+def test_deep_structure():
+    ext = None
+    for index in range(5000):
+        ext = ExtensionAttribute(
+            id=f"EA_{index}",
+            url="http://example.org",
+            instanceType="ExtensionAttribute",
+            extensionAttributes=[ext] if ext else [],
+        )
+    study = _study()
+    study.versions[0].extensionAttributes.append(ext)
+    data_store = DataStore(study)
+    assert data_store.get("ExtensionAttribute", "EA_0").id == "EA_0"
+
+
+def test_child_fields():
+    assert DataStore._model_child_fields(Code) == ("extensionAttributes",)
+    assert DataStore._model_child_fields(ParameterMap) == ("extensionAttributes",)
+    assert DataStore._model_child_fields(SyntaxTemplateDictionary) == (
+        "parameterMaps",
+        "extensionAttributes",
+    )
+
+
+def test_non_string_id():
+    study = _study()
+    data_store = DataStore(study)
+    assert data_store.get("Study", study.id) is study
+    assert data_store.get("Study", str(study.id)) is study
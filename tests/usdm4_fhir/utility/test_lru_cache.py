@@ -0,0 +1,37 @@
+from usdm4_fhir.utility.lru_cache import LRUCache
+
+
+def test_get_and_put():
+    cache = LRUCache(2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b", "default") == "default"
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 1, "maxsize": 2}
+
+
+def test_least_recently_used_evicted():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_disabled():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert len(cache) == 0
+    assert cache.get("a") is None
+
+
+def test_clear():
+    cache = LRUCache()
+    cache.put("a", 1)
+    cache.get("a")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 1024}
@@ -0,0 +1,85 @@
+import json
+import yaml
+from usdm4 import USDM4
+from tests.usdm4_fhir.helpers.files import read_json
+from usdm4_fhir import M11, SoA
+from usdm4_fhir.utility.data_store import DataStore
+from usdm4_fhir.utility.study_context import StudyContext
+
+
+def _study(name: str = "prism3/TCBCPT_01"):
+    path = f"tests/usdm4_fhir/test_files/m11/export/{name}_usdm.json"
+    return USDM4().from_json(json.loads(read_json(path))).study
+
+
+def test_maps_built_once():
+    study = _study()
+    context = StudyContext(study)
+    assert isinstance(context.data_store, DataStore)
+    assert context.data_store is context.data_store
+    nc_map = context.narrative_content_map()
+    assert nc_map is context.narrative_content_map()
+    assert len(nc_map) == len(study.documentedBy[0].versions[0].contents)
+    nci_map = context.narrative_content_item_map()
+    assert nci_map is context.narrative_content_item_map()
+    assert len(nci_map) == len(study.versions[0].narrativeContentItems)
+    criterion_map = context.criterion_map()
+    assert criterion_map is context.criterion_map()
+    assert len(criterion_map) == len(
+        study.versions[0].studyDesigns[0].eligibilityCriteria
+    )
+    activity_list = context.activity_list()
+    assert activity_list is context.activity_list()
+    assert activity_list == study.versions[0].studyDesigns[0].activity_list()
+
+
+def _extra(name: str = "prism3/TCBCPT_01"):
+    with open(f"tests/usdm4_fhir/test_files/m11/export/{name}_extra.yaml") as f:
+        return yaml.safe_load(f)
+
+
+def test_facades_share_context():
+    study = _study()
+    context = StudyContext(study)
+    m11 = M11()
+    m11.to_message(study, _extra(), M11.PRISM3, context=context)
+    assert m11._export._context is context
+    data_store = context.data_store
+    m11.to_message(study, _extra(), M11.PRISM2, context=context)
+    assert m11._export._data_store is data_store
+    soa = SoA()
+    timeline = study.versions[0].studyDesigns[0].main_timeline()
+    soa.to_message(study, timeline.id, "uuid", context=context)
+    assert soa._export._context is context
+
+
+def test_facades_context_per_study():
+    # Without a context each export uses the study it is given, even if a
+    # study with the same content was exported before
+    first = _study()
+    second = _study()
+    m11 = M11()
+    m11.to_message(first, _extra(), M11.PRISM3)
+    first.versions[0].titles[0].text = "CHANGED"
+    m11.to_message(second, _extra(), M11.PRISM3)
+    title = second.versions[0].titles[0]
+    assert m11._export._context.study is second
+    assert m11._export._data_store.get("StudyTitle", title.id) is title
+    assert title.text != "CHANGED"
+
+
+def test_context_of_another_study():
+    # A context created for another study is not used
+    first = _study()
+    second = _study()
+    context = StudyContext(first)
+    m11 = M11()
+    m11.to_message(second, _extra(), M11.PRISM3, context=context)
+    assert m11._export._context is not context
+    assert m11._export._context.study is second
+    assert "created for another study" in m11.errors.dump(0)
+    soa = SoA()
+    timeline = second.versions[0].studyDesigns[0].main_timeline()
+    soa.to_message(second, timeline.id, "uuid", context=context)
+    assert soa._export._context.study is second
+    assert "created for another study" in soa.errors.dump(0)